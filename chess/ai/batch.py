@@ -0,0 +1,283 @@
+"""Vectorised evaluation of many positions at once.
+
+Meant for offline work over game dumps, where looping over Board objects is
+far too slow.  The positions come in one of two layouts:
+
+    * states, an (N, 8, 8) uint32 array in the encoding of Board.state,
+    * bitboards, an (N, 12) uint64 array with one bitboard per piece kind
+      in the order of PIECE_KINDS, bit i set for square i (a8 is 0).
+
+Either one is turned into an (n, 64) array of kind indices (0 for an empty
+square, 1-12 for the piece kinds) a chunk at a time and every term is
+computed over the whole chunk with NumPy:
+
+    * material and piece-square tables, tapered, the same as the Board keeps,
+    * mobility, the squares each piece type attacks that are not taken by
+      its own side, counted once per type (union of the attacks),
+    * the pawn terms of PawnStructure: doubled, isolated, backward and
+      passed pawns, the king shelter and the free passers.
+
+Without the mobility the score is the one Evaluation.evaluate gives.
+
+Only one chunk is ever in memory besides the scores, so a numpy.memmap of
+any size can be passed in.  Scores are in centipawns from white's point of
+view.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from chess.ai.pawns import BACKWARD_PAWN, DOUBLED_PAWN, FREE_PASSER_EG, ISOLATED_PAWN, PASSED_PAWN_EG, PASSED_PAWN_MG, SHELTER_BY_PROGRESS
+from chess.board import Board
+from chess.board.bitboard import PIECE_KINDS
+from chess.board.pst import MAX_PHASE, Pst
+from chess.pieces.piece import Piece
+
+CHUNK_SIZE = 4096
+KINDS = len(PIECE_KINDS)
+
+# Centipawns per attacked square, by piece type.
+MOBILITY_WEIGHTS = {Piece.KNIGHT: 4, Piece.BISHOP: 5, Piece.ROOK: 2, Piece.QUEEN: 1}
+# The pawn tables of PawnStructure as arrays, indexed by how far a pawn got.
+_PASSED_PAWN_MG = np.array(PASSED_PAWN_MG, dtype=np.int32)
+_PASSED_PAWN_EG = np.array(PASSED_PAWN_EG, dtype=np.int32)
+_SHELTER_BY_PROGRESS = np.array(SHELTER_BY_PROGRESS, dtype=np.int32)
+
+# (colour bits << 3 | type) -> kind index, colour bits are 1 for white and 2 for black.
+_KIND_LUT = np.zeros(32, dtype=np.uint8)
+for _index, _kind in enumerate(PIECE_KINDS, 1):
+    _KIND_LUT[(_kind >> 8) << 3 | (_kind & Piece.TYPE_MASK)] = _index
+# Kind index -> signed scores per square, row 0 is the empty square.
+_MG = np.zeros((KINDS + 1, 64), dtype=np.int32)
+_EG = np.zeros((KINDS + 1, 64), dtype=np.int32)
+_PHASE = np.zeros(KINDS + 1, dtype=np.int32)
+for _index, _kind in enumerate(PIECE_KINDS, 1):
+    _MG[_index] = Pst.MG[_kind]
+    _EG[_index] = Pst.EG[_kind]
+    _PHASE[_index] = Pst.PHASE[_kind & Piece.TYPE_MASK]
+_SQUARES = np.arange(64)
+
+
+def _kind_index(color: int, ptype: int) -> int:
+    return PIECE_KINDS.index(color | ptype) + 1
+
+
+WHITE_PAWN = _kind_index(Piece.WHITE, Piece.PAWN)
+BLACK_PAWN = _kind_index(Piece.BLACK, Piece.PAWN)
+
+FILE_A = np.uint64(0x0101010101010101)
+FILE_H = np.uint64(0x8080808080808080)
+NOT_FILE_A = ~FILE_A
+NOT_FILE_H = ~FILE_H
+NOT_FILE_AB = ~(FILE_A | FILE_A << np.uint64(1))
+NOT_FILE_GH = ~(FILE_H | FILE_H >> np.uint64(1))
+ALL_SQUARES = np.uint64(0xFFFFFFFFFFFFFFFF)
+# (shift, mask) of a step, a positive shift moves towards h1.  The mask drops the squares that wrapped around a side.
+KNIGHT_STEPS = ((17, NOT_FILE_A), (15, NOT_FILE_H), (10, NOT_FILE_AB), (6, NOT_FILE_GH),
+                (-6, NOT_FILE_AB), (-10, NOT_FILE_GH), (-15, NOT_FILE_A), (-17, NOT_FILE_H))
+ROOK_STEPS = ((8, ALL_SQUARES), (-8, ALL_SQUARES), (1, NOT_FILE_A), (-1, NOT_FILE_H))
+BISHOP_STEPS = ((9, NOT_FILE_A), (7, NOT_FILE_H), (-7, NOT_FILE_A), (-9, NOT_FILE_H))
+
+
+def evaluate_states(states: np.ndarray, chunk_size: int = CHUNK_SIZE, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Score every position of an (N, 8, 8) array in the Board.state encoding.
+
+    Parameters
+    ----------
+    states : np.ndarray
+        The positions, a numpy.memmap is read one chunk at a time.
+    chunk_size : int
+        Positions evaluated together, bounds the memory used.
+    out : np.ndarray, optional
+        (N,) int32 array to write the scores into, a new one by default.
+
+    Returns
+    -------
+    np.ndarray
+        The N scores, from white's point of view.
+    """
+    return _evaluate(states, _kinds_from_states, chunk_size, out)
+
+
+def evaluate_bitboards(bitboards: np.ndarray, chunk_size: int = CHUNK_SIZE, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Score every position of an (N, 12) uint64 array of piece bitboards, see evaluate_states for the rest."""
+    return _evaluate(bitboards, _kinds_from_bitboards, chunk_size, out)
+
+
+def pack_bitboards(board: Board) -> np.ndarray:
+    """The bitboards of a board in the layout evaluate_bitboards takes, one row of the batch."""
+    return np.array([board.bitboards[kind] for kind in PIECE_KINDS], dtype=np.uint64)
+
+
+def _evaluate(positions: np.ndarray, to_kinds, chunk_size: int, out: Optional[np.ndarray]) -> np.ndarray:
+    count = len(positions)
+    if out is None:
+        out = np.empty(count, dtype=np.int32)
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        out[start:stop] = evaluate_kinds(to_kinds(np.asarray(positions[start:stop])))
+    return out
+
+
+def _kinds_from_states(states: np.ndarray) -> np.ndarray:
+    states = states.reshape(len(states), 64)
+    return _KIND_LUT[((states >> 8) & 0x3) << 3 | (states & Piece.TYPE_MASK)]
+
+
+def _kinds_from_bitboards(bitboards: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(bitboards.astype("<u8").view(np.uint8).reshape(len(bitboards), KINDS, 8), axis=2, bitorder="little")
+    # Every square holds at most one kind, so the weighted sum is its index.
+    return np.einsum("nks,k->ns", bits, np.arange(1, KINDS + 1, dtype=np.uint8)).astype(np.uint8)
+
+
+def evaluate_kinds(kinds: np.ndarray) -> np.ndarray:
+    """Score an (n, 64) array of kind indices, the common part of both layouts."""
+    pawns_mg, pawns_eg = pawn_structure(kinds)
+    mg = _MG[kinds, _SQUARES].sum(axis=1) + pawns_mg
+    eg = _EG[kinds, _SQUARES].sum(axis=1) + pawns_eg
+    phase = np.minimum(_PHASE[kinds].sum(axis=1), MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    return (score + mobility(kinds)).astype(np.int32)
+
+
+def mobility(kinds: np.ndarray) -> np.ndarray:
+    """Mobility term of an (n, 64) array of kind indices, white minus black."""
+    bitboards = _pack(kinds)
+    occupancy = {color: np.bitwise_or.reduce(bitboards[:, list(_kind_range(color))], axis=1) for color in (Piece.WHITE, Piece.BLACK)}
+    empty = ~(occupancy[Piece.WHITE] | occupancy[Piece.BLACK])
+    score = np.zeros(len(kinds), dtype=np.int32)
+    for color, sign in ((Piece.WHITE, 1), (Piece.BLACK, -1)):
+        not_own = ~occupancy[color]
+        for ptype, weight in MOBILITY_WEIGHTS.items():
+            pieces = bitboards[:, _kind_index(color, ptype) - 1]
+            if ptype == Piece.KNIGHT:
+                attacks = _steps(pieces, KNIGHT_STEPS)
+            else:
+                attacks = np.zeros_like(pieces)
+                if ptype != Piece.BISHOP:
+                    attacks |= _slides(pieces, empty, ROOK_STEPS)
+                if ptype != Piece.ROOK:
+                    attacks |= _slides(pieces, empty, BISHOP_STEPS)
+            score += sign * weight * _popcount(attacks & not_own)
+    return score
+
+
+def pawn_structure(kinds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Middlegame and endgame pawn terms of PawnStructure, with the king shelter and free passers, white minus black."""
+    boards = kinds.reshape(len(kinds), 8, 8)
+    white = boards == WHITE_PAWN
+    black = boards == BLACK_PAWN
+    empty = boards == 0
+    # Whether a pawn of the side is on the row or any row above it (towards rank 8) / below it.
+    black_above = np.logical_or.accumulate(black, axis=1)
+    white_below = np.logical_or.accumulate(white[:, ::-1], axis=1)[:, ::-1]
+    # A white pawn is passed without black pawns in the rows in front of it on its own and the next files.
+    white_blocked = _spread_files(np.pad(black_above[:, :-1], ((0, 0), (1, 0), (0, 0))))
+    black_blocked = _spread_files(np.pad(white_below[:, 1:], ((0, 0), (0, 1), (0, 0))))
+    # Own pawns level with or behind it on the adjacent files could still come up to protect it.
+    white_support = _adjacent_files(white_below)
+    black_support = _adjacent_files(black_above)
+    # The square in front of a pawn is attacked by the enemy pawns two rows ahead on the adjacent files.
+    white_front_attacked = np.pad(_adjacent_files(black)[:, :-2], ((0, 0), (2, 0), (0, 0)))
+    black_front_attacked = np.pad(_adjacent_files(white)[:, 2:], ((0, 0), (0, 2), (0, 0)))
+    white_front_free = np.pad(empty[:, :-1], ((0, 0), (1, 0), (0, 0)))
+    black_front_free = np.pad(empty[:, 1:], ((0, 0), (0, 1), (0, 0)))
+    rows = np.arange(8)
+    mg = np.zeros(len(kinds), dtype=np.int32)
+    eg = np.zeros(len(kinds), dtype=np.int32)
+    for color, pawns, blocked, support, front_attacked, front_free, progress, sign in (
+        (Piece.WHITE, white, white_blocked, white_support, white_front_attacked, white_front_free, 7 - rows, 1),
+        (Piece.BLACK, black, black_blocked, black_support, black_front_attacked, black_front_free, rows, -1),
+    ):
+        files = pawns.sum(axis=1)
+        neighbours = np.pad(files, ((0, 0), (1, 1)))
+        isolated_files = (neighbours[:, :-2] + neighbours[:, 2:]) == 0
+        doubled = np.maximum(files - 1, 0).sum(axis=1)
+        isolated = (files * isolated_files).sum(axis=1)
+        backward = (pawns & ~isolated_files[:, None, :] & ~support & front_attacked).sum(axis=(1, 2))
+        passed = pawns & ~blocked
+        passed_rows = passed.sum(axis=2)
+        mg += sign * (
+            DOUBLED_PAWN[0] * doubled + ISOLATED_PAWN[0] * isolated + BACKWARD_PAWN[0] * backward
+            + (passed_rows * _PASSED_PAWN_MG[progress]).sum(axis=1)
+            + _king_shelter(boards, pawns, color)
+        )
+        eg += sign * (
+            DOUBLED_PAWN[1] * doubled + ISOLATED_PAWN[1] * isolated + BACKWARD_PAWN[1] * backward
+            + (passed_rows * _PASSED_PAWN_EG[progress]).sum(axis=1)
+            + FREE_PASSER_EG * (passed & front_free).sum(axis=(1, 2))
+        )
+    return mg, eg
+
+
+def _king_shelter(boards: np.ndarray, pawns: np.ndarray, color: int) -> np.ndarray:
+    """Shelter of the king of the colour while it is on its two home rows, as PawnStructure.shelter scores it."""
+    # Rows counted from the king's side, so the first pawn found on a file is the one closest to it.
+    closest = pawns[:, ::-1] if color == Piece.WHITE else pawns
+    progress = np.where(closest.any(axis=1), closest.argmax(axis=1), 7)
+    file_scores = np.pad(_SHELTER_BY_PROGRESS[progress], ((0, 0), (1, 1)))
+    shelter = file_scores[:, :-2] + file_scores[:, 1:-1] + file_scores[:, 2:]
+    home_rows = [6, 7] if color == Piece.WHITE else [0, 1]
+    king = (boards[:, home_rows] == _kind_index(color, Piece.KING)).any(axis=1)
+    return (shelter * king).sum(axis=1)
+
+
+def _kind_range(color: int) -> range:
+    # Columns of the colour in the packed bitboards.
+    return range(0, KINDS // 2) if color == Piece.WHITE else range(KINDS // 2, KINDS)
+
+
+def _pack(kinds: np.ndarray) -> np.ndarray:
+    """(n, 64) kind indices to (n, 12) uint64 bitboards."""
+    bits = kinds[:, None, :] == np.arange(1, KINDS + 1, dtype=kinds.dtype)[None, :, None]
+    return np.packbits(bits, axis=2, bitorder="little").view("<u8").reshape(len(kinds), KINDS)
+
+
+def _shift(bitboards: np.ndarray, shift: int) -> np.ndarray:
+    if shift > 0:
+        return bitboards << np.uint64(shift)
+    return bitboards >> np.uint64(-shift)
+
+
+def _steps(pieces: np.ndarray, steps) -> np.ndarray:
+    attacks = np.zeros_like(pieces)
+    for shift, mask in steps:
+        attacks |= _shift(pieces, shift) & mask
+    return attacks
+
+
+def _slides(pieces: np.ndarray, empty: np.ndarray, steps) -> np.ndarray:
+    """Attacks of the sliders along the steps, stopping at the first piece, with Kogge-Stone fills."""
+    attacks = np.zeros_like(pieces)
+    for shift, mask in steps:
+        generated = pieces
+        propagate = empty & mask
+        for factor in (1, 2, 4):
+            generated = generated | (propagate & _shift(generated, shift * factor))
+            propagate = propagate & _shift(propagate, shift * factor)
+        attacks |= _shift(generated, shift) & mask
+    return attacks
+
+
+def _adjacent_files(squares: np.ndarray) -> np.ndarray:
+    """Mark the files on either side of every marked square, but not its own, on (n, 8, 8) boolean boards."""
+    adjacent = np.zeros_like(squares)
+    adjacent[:, :, 1:] |= squares[:, :, :-1]
+    adjacent[:, :, :-1] |= squares[:, :, 1:]
+    return adjacent
+
+
+def _spread_files(squares: np.ndarray) -> np.ndarray:
+    """Mark the files on either side of every marked square too, on (n, 8, 8) boolean boards."""
+    spread = squares.copy()
+    spread[:, :, 1:] |= squares[:, :, :-1]
+    spread[:, :, :-1] |= squares[:, :, 1:]
+    return spread
+
+
+def _popcount(bitboards: np.ndarray) -> np.ndarray:
+    # Bit counting without numpy.bitwise_count, which older NumPy versions lack.
+    bitboards = bitboards - ((bitboards >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    bitboards = (bitboards & np.uint64(0x3333333333333333)) + ((bitboards >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    bitboards = (bitboards + (bitboards >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((bitboards * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int32)
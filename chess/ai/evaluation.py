@@ -0,0 +1,68 @@
+"""Static evaluation of a position.
+
+Scores are in centipawns and always from the point of view of the side to
+move, which is what negamax expects.
+
+The evaluation is material plus piece-square tables, tapered between a
+middlegame and an endgame score by the material left on the board.  Both
+scores are kept up to date by the Board on every move, evaluate only blends
+them, evaluate_full scores the position from scratch to check them against.
+
+On top of that come the pawn structure and king shelter terms of
+chess.ai.pawns, looked up in a PawnHashTable when one is given.
+
+A board with an NnueAccumulator attached (chess.ai.nnue) is scored by the
+network instead.
+"""
+from typing import Dict, Optional
+
+from chess.ai.pawns import PawnHashTable, PawnStructure
+from chess.board import Board, Pst
+from chess.board.pst import MAX_PHASE
+from chess.pieces.piece import Piece
+
+PIECE_VALUES: Dict[int, int] = {
+    Piece.PAWN: 100,
+    Piece.KNIGHT: 320,
+    Piece.BISHOP: 330,
+    Piece.ROOK: 500,
+    Piece.QUEEN: 900,
+    Piece.KING: 0,
+}
+
+
+class Evaluation:
+    """Collection of the evaluation terms."""
+
+    @staticmethod
+    def tapered(mg_score: int, eg_score: int, phase: int) -> int:
+        """Blend the middlegame and endgame scores, the phase goes from MAX_PHASE at the start to 0 with only pawns left."""
+        phase = min(phase, MAX_PHASE)
+        return (mg_score * phase + eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+
+    @staticmethod
+    def evaluate(board: Board, pawn_table: Optional[PawnHashTable] = None) -> int:
+        """Score of the position for the side to move, from the incremental scores of the board.
+
+        Parameters
+        ----------
+        board : Board
+            The position.
+        pawn_table : PawnHashTable, optional
+            Cache of the pawn structure, it is computed from scratch without one.
+        """
+        if board.nnue is not None:
+            return board.nnue.evaluate()
+        entry = pawn_table.probe(board) if pawn_table is not None else PawnStructure.evaluate(board)
+        king_mg, king_eg = PawnStructure.king_terms(board, entry)
+        score = Evaluation.tapered(board.mg_score + entry.mg + king_mg, board.eg_score + entry.eg + king_eg, board.phase)
+        return score if board.color_to_move == Piece.WHITE else -score
+
+    @staticmethod
+    def evaluate_full(board: Board) -> int:
+        """Same as evaluate but recomputed from the pieces, to verify the incremental scores."""
+        mg, eg, phase = Pst.compute(board)
+        entry = PawnStructure.evaluate(board)
+        king_mg, king_eg = PawnStructure.king_terms(board, entry)
+        score = Evaluation.tapered(mg + entry.mg + king_mg, eg + entry.eg + king_eg, phase)
+        return score if board.color_to_move == Piece.WHITE else -score
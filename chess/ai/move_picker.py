@@ -1,4 +1,11 @@
 import random
+from typing import Optional, Tuple
+
+from chess.ai.search import SearchLimits
+from chess.moves.move import Move
+
+# What the PC player gets to think about every move.
+PC_LIMITS = SearchLimits(time=1.0)
 
 
 def random_legal_move(game):
@@ -11,3 +18,11 @@ def random_legal_move(game):
             end_coords = random.choice(list(r_piece_moves[1]))
             return r_piece_moves[0], end_coords
     return None
+
+
+def search_move(game, limits: SearchLimits = PC_LIMITS) -> Optional[Tuple[Tuple[int, int], Tuple[int, int], int]]:
+    """Get the best move the search finds within the limits, as the (start coords, end coords, promotion type) Game.make_move takes."""
+    result = game.search.search(limits)
+    if not result.move:
+        return None
+    return Move.get_start_coords(result.move), Move.get_end_coords(result.move), Move.get_promotion_type(result.move)
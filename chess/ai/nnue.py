@@ -0,0 +1,217 @@
+"""A small NNUE style evaluator in NumPy.
+
+The input layer has one feature per (own king square, piece, square) seen
+from each side, the kings themselves are not features.  For black the board
+is mirrored and the colours swapped, so both sides use the same weights.  A
+position only has a few dozen features set, so the first layer output, the
+accumulator, is the sum of their weight rows.
+
+The accumulators of both sides are kept up to date while the board is
+played on instead of being computed at every node:
+
+    * the Board tells the NnueAccumulator attached to it about every piece
+      it puts, removes or moves, which adds and subtracts the weight rows
+      of the features that changed,
+    * make_move pushes a copy of the accumulators on a stack and
+      unmake_move pops it, so taking a move back costs nothing,
+    * a king move changes every feature of its side, that side is only
+      refreshed from scratch when the position is evaluated.
+
+On top of the accumulators (side to move first) sits a tiny dense head:
+clipped ReLU, one hidden layer, clipped ReLU and the output, in centipawns.
+The weights come from a .npz file, see NnueNetwork.load for the arrays.
+"""
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+
+from chess.board import Board
+from chess.pieces.piece import Piece
+
+# Own and enemy pawn, knight, bishop, rook and queen.
+PIECE_FEATURES = 10
+FEATURES = 64 * PIECE_FEATURES * 64
+STACK_SIZE = 128
+NETWORK_ARRAYS = ("feature_weights", "feature_bias", "hidden_weights", "hidden_bias", "output_weights", "output_bias")
+
+
+def feature_index(perspective: int, king_sq: int, piece: int, sq: int) -> int:
+    """Input feature of a piece on a square, seen from the side whose king is on king_sq."""
+    if perspective == Piece.BLACK:
+        # Mirror the rows so black sees the board the way white does.
+        king_sq ^= 56
+        sq ^= 56
+    relation = 0 if piece & perspective else PIECE_FEATURES // 2
+    return ((king_sq * PIECE_FEATURES + relation + (piece & Piece.TYPE_MASK) - Piece.PAWN) << 6) | sq
+
+
+class NnueNetwork:
+    """The weights of the network."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], scale: float = 1.0):
+        """Check the shapes of the weights and keep them as float32.
+
+        Parameters
+        ----------
+        arrays : Dict[str, np.ndarray]
+            The arrays named in NETWORK_ARRAYS.
+        scale : float
+            What the output is multiplied by to get centipawns.
+        """
+        missing = [name for name in NETWORK_ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f"The network is missing {', '.join(missing)}.")
+        self.feature_weights: np.ndarray = np.ascontiguousarray(arrays["feature_weights"], dtype=np.float32)
+        self.feature_bias: np.ndarray = np.asarray(arrays["feature_bias"], dtype=np.float32)
+        self.hidden_weights: np.ndarray = np.asarray(arrays["hidden_weights"], dtype=np.float32)
+        self.hidden_bias: np.ndarray = np.asarray(arrays["hidden_bias"], dtype=np.float32)
+        self.output_weights: np.ndarray = np.asarray(arrays["output_weights"], dtype=np.float32)
+        self.output_bias: float = float(arrays["output_bias"])
+        self.scale: float = scale
+
+        hidden = self.feature_bias.shape[0]
+        layer = self.hidden_bias.shape[0]
+        if (
+            self.feature_weights.shape != (FEATURES, hidden)
+            or self.hidden_weights.shape != (2 * hidden, layer)
+            or self.output_weights.shape != (layer,)
+        ):
+            raise ValueError(
+                f"Unexpected network shapes: feature_weights {self.feature_weights.shape}, "
+                f"hidden_weights {self.hidden_weights.shape}, output_weights {self.output_weights.shape}."
+            )
+        self.hidden: int = hidden
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> "NnueNetwork":
+        """Load the weights from a .npz file holding the NETWORK_ARRAYS and optionally a 'scale'."""
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        return NnueNetwork(arrays, float(arrays.pop("scale", 1.0)))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the weights in the format load reads."""
+        np.savez(
+            path,
+            feature_weights=self.feature_weights,
+            feature_bias=self.feature_bias,
+            hidden_weights=self.hidden_weights,
+            hidden_bias=self.hidden_bias,
+            output_weights=self.output_weights,
+            output_bias=np.float32(self.output_bias),
+            scale=np.float32(self.scale),
+        )
+
+    @staticmethod
+    def random(hidden: int = 32, layer: int = 16, seed: int = 0) -> "NnueNetwork":
+        """A network with small random weights, to try the machinery out before there is a trained one."""
+        rng = np.random.default_rng(seed)
+        return NnueNetwork({
+            "feature_weights": rng.normal(0, 0.05, (FEATURES, hidden)),
+            "feature_bias": rng.normal(0, 0.05, hidden),
+            "hidden_weights": rng.normal(0, 0.2, (2 * hidden, layer)),
+            "hidden_bias": rng.normal(0, 0.05, layer),
+            "output_weights": rng.normal(0, 0.2, layer),
+            "output_bias": 0.0,
+        }, scale=100.0)
+
+    def head(self, own: np.ndarray, other: np.ndarray) -> int:
+        """Score for the side of the own accumulator from the two accumulators."""
+        hidden = np.clip(np.concatenate((own, other)), 0.0, 1.0) @ self.hidden_weights + self.hidden_bias
+        output = np.clip(hidden, 0.0, 1.0) @ self.output_weights + self.output_bias
+        return int(output * self.scale)
+
+
+class NnueAccumulator:
+    """The accumulators of a board, attach one with attach and the board keeps it up to date."""
+
+    def __init__(self, network: NnueNetwork):
+        self.network: NnueNetwork = network
+        # One (white, black) pair of accumulators per move played since the board was attached.
+        self.stack: np.ndarray = np.zeros((STACK_SIZE, 2, network.hidden), dtype=np.float32)
+        # Per level, whether the accumulator of a side has to be refreshed because its king moved.
+        self.dirty: np.ndarray = np.zeros((STACK_SIZE, 2), dtype=bool)
+        self.level: int = 0
+        self.board: Board
+
+    @staticmethod
+    def attach(board: Board, network: NnueNetwork) -> "NnueAccumulator":
+        """Start keeping the accumulators of a board, from then on Evaluation.evaluate uses the network."""
+        accumulator = NnueAccumulator(network)
+        accumulator.board = board
+        accumulator.refresh(Piece.WHITE)
+        accumulator.refresh(Piece.BLACK)
+        board.nnue = accumulator
+        return accumulator
+
+    @staticmethod
+    def detach(board: Board) -> None:
+        """Go back to the hand written evaluation."""
+        board.nnue = None
+
+    def refresh(self, perspective: int) -> None:
+        """Compute the accumulator of a side from scratch."""
+        board = self.board
+        king_sq = board.bitboards[perspective | Piece.KING].bit_length() - 1
+        features = [
+            feature_index(perspective, king_sq, piece, sq)
+            for sq, piece in enumerate(board.squares)
+            if piece and piece & Piece.TYPE_MASK != Piece.KING
+        ]
+        side = perspective >> 9
+        self.stack[self.level, side] = self.network.feature_bias + self.network.feature_weights[features].sum(axis=0)
+        self.dirty[self.level, side] = False
+
+    def push(self) -> None:
+        """Save the accumulators before a move, make_move calls it."""
+        level = self.level + 1
+        if level == len(self.stack):
+            self.stack = np.concatenate((self.stack, np.zeros_like(self.stack)))
+            self.dirty = np.concatenate((self.dirty, np.zeros_like(self.dirty)))
+        self.stack[level] = self.stack[level - 1]
+        self.dirty[level] = self.dirty[level - 1]
+        self.level = level
+
+    def pop(self) -> None:
+        """Go back to the accumulators from before the last move, unmake_move calls it."""
+        self.level -= 1
+
+    def add_piece(self, piece: int, sq: int) -> None:
+        self._update(piece, sq, 1)
+
+    def remove_piece(self, piece: int, sq: int) -> None:
+        self._update(piece, sq, -1)
+
+    def move_piece(self, piece: int, start_sq: int, end_sq: int) -> None:
+        if piece & Piece.TYPE_MASK == Piece.KING:
+            # Every feature of the side depends on its king, it is refreshed when it is needed.
+            self.dirty[self.level, (piece & Piece.COLOR_MASK) >> 9] = True
+            return
+        self._update(piece, start_sq, -1)
+        self._update(piece, end_sq, 1)
+
+    def _update(self, piece: int, sq: int, sign: int) -> None:
+        if piece & Piece.TYPE_MASK == Piece.KING:
+            return
+        weights = self.network.feature_weights
+        bitboards = self.board.bitboards
+        accumulators = self.stack[self.level]
+        for perspective in (Piece.WHITE, Piece.BLACK):
+            side = perspective >> 9
+            if self.dirty[self.level, side]:
+                continue
+            row = weights[feature_index(perspective, bitboards[perspective | Piece.KING].bit_length() - 1, piece, sq)]
+            if sign > 0:
+                accumulators[side] += row
+            else:
+                accumulators[side] -= row
+
+    def evaluate(self) -> int:
+        """Score of the position for the side to move."""
+        for perspective in (Piece.WHITE, Piece.BLACK):
+            if self.dirty[self.level, perspective >> 9]:
+                self.refresh(perspective)
+        accumulators = self.stack[self.level]
+        side = self.board.color_to_move >> 9
+        return self.network.head(accumulators[side], accumulators[side ^ 1])
@@ -0,0 +1,146 @@
+"""Move ordering for the search.
+
+Alpha-beta only cuts well when the best move comes first, so the moves of a
+node are handed out in stages:
+
+    1. the hash move from the transposition table,
+    2. captures by MVV-LVA (most valuable victim, least valuable attacker)
+       together with the queen promotions,
+    3. the two killer moves of the ply, quiet moves that caused a cutoff in
+       a sibling node,
+    4. the remaining quiet moves by their history score, under-promotions last.
+
+Within a stage the moves are picked one at a time by a selection scan
+rather than sorted up front, since most nodes that cut off do so after a
+move or two and never pay for the rest.
+"""
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+from chess.board import Board
+from chess.moves.move import Move
+from chess.pieces.piece import Piece
+
+# Indexed by piece type, the king is never a victim.
+ORDER_RANKS: List[int] = [0, 6, 1, 2, 3, 4, 5]
+HISTORY_MAX = 1 << 14
+# Colour bit (0 white, 1 black) and piece type, times the target square.
+HISTORY_SIZE = 2 * 8 * 64
+UNDER_PROMOTION_SCORE = -HISTORY_MAX - 1
+QUIET_FLAGS = frozenset((Move.NORMAL, Move.CASTLE, Move.PAWN_TWO_STEP))
+
+
+def history_index(piece: int, end_sq: int) -> int:
+    """Slot of a piece moving to a square in the history table."""
+    return ((piece >> 9) << 3 | piece & Piece.TYPE_MASK) << 6 | end_sq
+
+
+class MoveOrdering:
+    """Killer and history tables, they live as long as the search that owns them."""
+
+    def __init__(self, max_ply: int):
+        self.killers: List[List[int]] = [[0, 0] for _ in range(max_ply + 1)]
+        self.history: array = array("l", [0]) * HISTORY_SIZE
+
+    def new_search(self) -> None:
+        """Forget the killers and fade the history of the previous search."""
+        for killers in self.killers:
+            killers[0] = killers[1] = 0
+        history = self.history
+        for index in range(HISTORY_SIZE):
+            history[index] //= 2
+
+    @staticmethod
+    def is_quiet(board: Board, move: int) -> bool:
+        """Neither a capture nor a promotion."""
+        return not board.squares[(move >> Move.END_SHIFT) & Move.SQUARE_MASK] and move >> Move.FLAG_SHIFT in QUIET_FLAGS
+
+    def ordered_moves(self, board: Board, moves: array, tt_move: int, ply: int) -> Iterator[int]:
+        """Hand the moves out best first, see the module docstring for the stages.
+
+        The board may be played on between two moves, as long as it is back in the same position.
+        """
+        squares = board.squares
+        if tt_move and tt_move in moves:
+            yield tt_move
+
+        captures: List[Tuple[int, int]] = []
+        quiets: List[int] = []
+        under_promotions: List[int] = []
+        for move in moves:
+            if move == tt_move:
+                continue
+            score = capture_score(squares, move)
+            if score is not None:
+                captures.append((score, move))
+            elif move >> Move.FLAG_SHIFT in QUIET_FLAGS:
+                quiets.append(move)
+            else:
+                under_promotions.append(move)
+        yield from select_best(captures)
+
+        for killer in self.killers[ply]:
+            if killer and killer != tt_move and killer in quiets:
+                quiets.remove(killer)
+                yield killer
+
+        history = self.history
+        scored = [(history[history_index(squares[move & Move.SQUARE_MASK], (move >> Move.END_SHIFT) & Move.SQUARE_MASK)], move) for move in quiets]
+        scored.extend((UNDER_PROMOTION_SCORE, move) for move in under_promotions)
+        yield from select_best(scored)
+
+    @staticmethod
+    def ordered_captures(board: Board, moves: array) -> Iterator[int]:
+        """Only the captures and queen promotions, by MVV-LVA, for the quiescence search."""
+        squares = board.squares
+        captures = []
+        for move in moves:
+            score = capture_score(squares, move)
+            if score is not None:
+                captures.append((score, move))
+        return select_best(captures)
+
+    def update_quiet(self, board: Board, move: int, depth: int, ply: int, tried_quiets: List[int]) -> None:
+        """Reward a quiet move that caused a cutoff and punish the quiet moves tried before it."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        bonus = min(depth * depth, HISTORY_MAX)
+        squares = board.squares
+        self._update_history(history_index(squares[move & Move.SQUARE_MASK], (move >> Move.END_SHIFT) & Move.SQUARE_MASK), bonus)
+        for quiet in tried_quiets:
+            self._update_history(history_index(squares[quiet & Move.SQUARE_MASK], (quiet >> Move.END_SHIFT) & Move.SQUARE_MASK), -bonus)
+
+    def _update_history(self, index: int, bonus: int) -> None:
+        # The closer a score gets to HISTORY_MAX the less it moves, so it never leaves the range.
+        history = self.history
+        history[index] += bonus - history[index] * abs(bonus) // HISTORY_MAX
+
+
+def capture_score(squares: List[int], move: int) -> Optional[int]:
+    """MVV-LVA score of a capture or a queen promotion, None for the other moves."""
+    flag = move >> Move.FLAG_SHIFT
+    victim = squares[(move >> Move.END_SHIFT) & Move.SQUARE_MASK] & Piece.TYPE_MASK
+    if flag == Move.PROMOTE_QUEEN:
+        return ORDER_RANKS[Piece.QUEEN] * 8 + ORDER_RANKS[victim] * 8
+    if flag == Move.EN_PASSANT_CAPTURE:
+        victim = Piece.PAWN
+    elif not victim or flag not in QUIET_FLAGS:
+        return None
+    return ORDER_RANKS[victim] * 8 - ORDER_RANKS[squares[move & Move.SQUARE_MASK] & Piece.TYPE_MASK]
+
+
+def select_best(scored: List[Tuple[int, int]]) -> Iterator[int]:
+    """Yield the moves of (score, move) pairs highest score first, finding each with a scan of what is left."""
+    while scored:
+        best = 0
+        best_score = scored[0][0]
+        for index in range(1, len(scored)):
+            if scored[index][0] > best_score:
+                best = index
+                best_score = scored[index][0]
+        move = scored[best][1]
+        scored[best] = scored[-1]
+        scored.pop()
+        yield move
@@ -0,0 +1,211 @@
+"""Pawn structure evaluation and the pawn hash table.
+
+The pawn terms only depend on where the pawns are, which changes in few of
+the moves of a search, so their result is cached in a PawnHashTable keyed by
+the pawn key the Board keeps next to its position key.  An entry holds:
+
+    * the middlegame and endgame score of the structure (white minus black):
+      doubled, isolated, backward and passed pawns,
+    * the passed pawns of each side, for the terms that also depend on the
+      other pieces,
+    * the king shelter of each side for every file its king could be on,
+      the king moves more often than the pawns so it is looked up per node.
+
+Squares and rows follow the board numbering, a8 is square 0 and white pawns
+move towards row 0.
+"""
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from chess.board import Board
+from chess.moves.attacks import PAWN_ATTACKS
+from chess.pieces.piece import Piece
+
+# (middlegame, endgame) per pawn.
+DOUBLED_PAWN = (-10, -20)
+ISOLATED_PAWN = (-10, -15)
+BACKWARD_PAWN = (-8, -10)
+# Indexed by how far the pawn got, 1 on its starting row up to 6 one step before promoting.
+PASSED_PAWN_MG = (0, 5, 10, 15, 25, 40, 60, 0)
+PASSED_PAWN_EG = (0, 10, 20, 35, 60, 100, 150, 0)
+# Endgame bonus of a passed pawn with nothing in front of it.
+FREE_PASSER_EG = 10
+# Middlegame score of the file in front of the king by how far its own most advanced shelter pawn got, 7 when there is none.
+SHELTER_BY_PROGRESS = (0, 0, -10, -20, -20, -20, -20, -30)
+
+FILE_BB: List[int] = [0x0101010101010101 << file for file in range(8)]
+ADJACENT_FILES_BB: List[int] = [(FILE_BB[file - 1] if file else 0) | (FILE_BB[file + 1] if file < 7 else 0) for file in range(8)]
+
+
+def _rows_bb(rows) -> int:
+    bb = 0
+    for row in rows:
+        bb |= 0xFF << (row * 8)
+    return bb
+
+
+# The rows in front of a square for each colour, and the ones level with or behind it.
+AHEAD_ROWS_BB: Dict[int, List[int]] = {
+    Piece.WHITE: [_rows_bb(range(0, sq >> 3)) for sq in range(64)],
+    Piece.BLACK: [_rows_bb(range((sq >> 3) + 1, 8)) for sq in range(64)],
+}
+BEHIND_ROWS_BB: Dict[int, List[int]] = {
+    Piece.WHITE: [_rows_bb(range(sq >> 3, 8)) for sq in range(64)],
+    Piece.BLACK: [_rows_bb(range(0, (sq >> 3) + 1)) for sq in range(64)],
+}
+# A pawn is passed when no enemy pawn is in its span, its own and the adjacent files in front of it.
+PASSED_SPAN_BB: Dict[int, List[int]] = {
+    color: [AHEAD_ROWS_BB[color][sq] & (FILE_BB[sq & 7] | ADJACENT_FILES_BB[sq & 7]) for sq in range(64)]
+    for color in (Piece.WHITE, Piece.BLACK)
+}
+# Own pawns that could still come up to protect it, level with or behind it on the adjacent files.
+SUPPORT_SPAN_BB: Dict[int, List[int]] = {
+    color: [BEHIND_ROWS_BB[color][sq] & ADJACENT_FILES_BB[sq & 7] for sq in range(64)]
+    for color in (Piece.WHITE, Piece.BLACK)
+}
+PAWN_STEP: Dict[int, int] = {Piece.WHITE: -8, Piece.BLACK: 8}
+# The two rows a king is sheltered on, and the two shelter pawns can stand on in front of it.
+KING_HOME_BB: Dict[int, int] = {Piece.WHITE: _rows_bb((6, 7)), Piece.BLACK: _rows_bb((0, 1))}
+
+
+class PawnEntry(NamedTuple):
+    """What the pawns alone say about a position."""
+
+    mg: int
+    eg: int
+    # Colour -> bitboard of its passed pawns.
+    passed: Dict[int, int]
+    # Colour -> shelter score (middlegame, for that side) of a king on each file.
+    shelter: Dict[int, Tuple[int, ...]]
+
+
+class PawnStructure:
+    """Collection of the pawn terms, computed from the pawn bitboards."""
+
+    @staticmethod
+    def progress(color: int, sq: int) -> int:
+        """How many rows a pawn on the square got from its side's back row, 1 on its starting row."""
+        row = sq >> 3
+        return 7 - row if color == Piece.WHITE else row
+
+    @staticmethod
+    def evaluate(board: Board) -> PawnEntry:
+        """Score the pawn structure of a board from scratch."""
+        bitboards = board.bitboards
+        pawns = {color: bitboards[color | Piece.PAWN] for color in (Piece.WHITE, Piece.BLACK)}
+        mg = eg = 0
+        passed = {}
+        shelter = {}
+        for color, sign in ((Piece.WHITE, 1), (Piece.BLACK, -1)):
+            own = pawns[color]
+            enemy_color = Piece.get_enemy_color(color)
+            enemy = pawns[enemy_color]
+            side_mg = side_eg = 0
+            side_passed = 0
+            bb = own
+            while bb:
+                sq = (bb & -bb).bit_length() - 1
+                bb &= bb - 1
+                file = sq & 7
+                if own & FILE_BB[file] & AHEAD_ROWS_BB[color][sq]:
+                    # Only the pawns with another one in front of them count, so a pair is one doubled pawn.
+                    side_mg += DOUBLED_PAWN[0]
+                    side_eg += DOUBLED_PAWN[1]
+                if not own & ADJACENT_FILES_BB[file]:
+                    side_mg += ISOLATED_PAWN[0]
+                    side_eg += ISOLATED_PAWN[1]
+                elif not own & SUPPORT_SPAN_BB[color][sq] and PAWN_ATTACKS[color][sq + PAWN_STEP[color]] & enemy:
+                    # Nothing can come up to protect it and it can not advance without being taken.
+                    side_mg += BACKWARD_PAWN[0]
+                    side_eg += BACKWARD_PAWN[1]
+                if not enemy & PASSED_SPAN_BB[color][sq]:
+                    side_passed |= 1 << sq
+                    progress = PawnStructure.progress(color, sq)
+                    side_mg += PASSED_PAWN_MG[progress]
+                    side_eg += PASSED_PAWN_EG[progress]
+            mg += sign * side_mg
+            eg += sign * side_eg
+            passed[color] = side_passed
+            shelter[color] = PawnStructure.shelter(color, own)
+        return PawnEntry(mg, eg, passed, shelter)
+
+    @staticmethod
+    def shelter(color: int, own: int) -> Tuple[int, ...]:
+        """Shelter score of a king of the colour on each file, from its pawns on the file and the ones next to it."""
+        file_scores = []
+        for file in range(8):
+            file_pawns = own & FILE_BB[file]
+            if not file_pawns:
+                file_scores.append(SHELTER_BY_PROGRESS[7])
+                continue
+            # The pawn closest to the king is the one that shelters it.
+            sq = file_pawns.bit_length() - 1 if color == Piece.WHITE else (file_pawns & -file_pawns).bit_length() - 1
+            file_scores.append(SHELTER_BY_PROGRESS[PawnStructure.progress(color, sq)])
+        return tuple(sum(file_scores[max(file - 1, 0):file + 2]) for file in range(8))
+
+    @staticmethod
+    def king_terms(board: Board, entry: PawnEntry) -> Tuple[int, int]:
+        """(middlegame, endgame) of the terms that need the pawn entry and the other pieces, white minus black."""
+        bitboards = board.bitboards
+        occupied = board.occupied
+        mg = eg = 0
+        for color, sign in ((Piece.WHITE, 1), (Piece.BLACK, -1)):
+            king = bitboards[color | Piece.KING]
+            if king & KING_HOME_BB[color]:
+                mg += sign * entry.shelter[color][(king.bit_length() - 1) & 7]
+            bb = entry.passed[color]
+            step = PAWN_STEP[color]
+            while bb:
+                sq = (bb & -bb).bit_length() - 1
+                bb &= bb - 1
+                if not occupied >> (sq + step) & 1:
+                    eg += sign * FREE_PASSER_EG
+        return mg, eg
+
+
+class PawnHashTable:
+    """Fixed-size table of PawnEntry keyed by the pawn key of the Board, always replacing."""
+
+    def __init__(self, entries: int = 1 << 14):
+        """Allocate the table.
+
+        Parameters
+        ----------
+        entries : int
+            Number of slots, rounded down to a power of two.
+        """
+        self.size: int = 1 << (max(entries, 1).bit_length() - 1)
+        self.mask: int = self.size - 1
+        self.keys: array = array("Q", bytes(8 * self.size))
+        self.entries: List[Optional[PawnEntry]] = [None] * self.size
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def clear(self) -> None:
+        """Empty the table and reset the counters."""
+        self.keys = array("Q", bytes(8 * self.size))
+        self.entries = [None] * self.size
+        self.hits = self.misses = 0
+
+    def probe(self, board: Board) -> PawnEntry:
+        """Entry of the pawns of the board, computed and stored on a miss."""
+        key = board.pawn_key
+        slot = key & self.mask
+        if self.keys[slot] == key:
+            self.hits += 1
+            return self.entries[slot]
+        self.misses += 1
+        entry = PawnStructure.evaluate(board)
+        self.keys[slot] = key
+        self.entries[slot] = entry
+        return entry
+
+    def stats(self) -> Dict[str, float]:
+        """Counters collected since the table was created or cleared."""
+        probes = self.hits + self.misses
+        return {
+            "entries": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
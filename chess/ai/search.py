@@ -0,0 +1,577 @@
+"""Alpha-beta search.
+
+Negamax with alpha-beta pruning, run inside an iterative deepening loop so
+there is always a complete result of the last finished depth to fall back
+on when a limit stops the search.  Every finished iteration stores its best
+moves in the transposition table, which the next, deeper one tries first,
+the rest of the moves are ordered by MoveOrdering.  From the fourth depth on
+the root is searched in an aspiration window around the previous score,
+widened and searched again whenever the score falls outside of it.  The
+cost of every depth is kept in an IterationStats.
+
+A soft time limit only keeps a new depth from being started, the hard one
+and the node limit abort the search in the middle of an iteration, they
+are checked every few hundred nodes.
+
+At the horizon a quiescence search keeps playing captures and promotions
+until the position is quiet, skipping the captures the static exchange
+evaluation says lose material, so the evaluation is never taken in the
+middle of an exchange.
+
+Inside the tree the search is selective, every part of it can be switched
+off with SearchOptions:
+
+    * principal variation search: the moves after the first are searched
+      with a zero window and only searched again when they beat it,
+    * null-move pruning: a side that is still above beta after passing is
+      cut off at a reduced depth, unless it has nothing but pawns left
+      where zugzwang makes passing unsound,
+    * late move reductions: quiet moves late in the ordering are searched
+      shallower first,
+    * futility pruning: near the horizon quiet moves are skipped when the
+      static evaluation is too far below alpha.
+
+The principal variation is kept in a triangular table: every node copies
+the line of the child that raised alpha behind its own move.
+
+Given Tablebases, the positions inside the tree with few enough pieces get
+their exact score from the tables instead of being searched.
+"""
+import math
+import time
+from array import array
+from multiprocessing.synchronize import Event
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from chess.ai.evaluation import Evaluation
+from chess.ai.ordering import MoveOrdering
+from chess.ai.pawns import PawnHashTable
+from chess.ai.see import static_exchange
+from chess.ai.tablebase import MAX_PIECES, Tablebases
+from chess.ai.timeman import TimeControl, TimeManager
+from chess.ai.transposition import Bound, TranspositionTable
+from chess.board import Board
+from chess.moves.move import Move
+from chess.moves.movegenerator import MoveGenerator
+from chess.pieces.piece import Piece
+
+MAX_PLY = 64
+INFINITY = 32000
+MATE_SCORE = 30000
+# Scores beyond this are mates, the distance to the mate is taken off them.  The mates
+# read from the tablebases can be a lot further away than the search ever gets.
+MATE_BOUND = MATE_SCORE - 1000
+DRAW_SCORE = 0
+# How many nodes go by between two looks at the clock, a few milliseconds of search.
+CHECK_EVERY = 256
+
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+# Indexed by the remaining depth, how far below alpha the static evaluation may be before quiet moves are skipped.
+FUTILITY_MARGINS = (0, 200, 400)
+LMR_MIN_DEPTH = 3
+# The first moves of the ordering are never reduced.
+LMR_FULL_MOVES = 3
+LMR_MAX_MOVES = 63
+# Half width of the first aspiration window around the score of the previous depth, in centipawns.
+ASPIRATION_WINDOW = 25
+ASPIRATION_MIN_DEPTH = 4
+LMR_REDUCTIONS: List[List[int]] = [
+    [0 if not depth or not count else int(0.75 + math.log(depth) * math.log(count) / 2.25) for count in range(LMR_MAX_MOVES + 1)]
+    for depth in range(MAX_PLY + 1)
+]
+
+
+class SearchLimits(NamedTuple):
+    """When to stop, the search ends at the first limit reached."""
+
+    depth: int = MAX_PLY
+    nodes: Optional[int] = None
+    # Seconds, the hard limit, the search is aborted when it is reached.
+    time: Optional[float] = None
+    # Seconds, no new depth is started after it.
+    soft_time: Optional[float] = None
+    # Playing on a clock, the time manager turns it into a soft and a hard limit on top of the ones above.
+    clock: Optional[TimeControl] = None
+
+
+class IterationStats(NamedTuple):
+    """What one depth of the iterative deepening cost."""
+
+    depth: int
+    # Nodes and seconds of this iteration alone, the re-searches included.
+    nodes: int
+    time: float
+    # Aspiration windows the score fell outside of.
+    re_searches: int
+    tt_hits: int
+    # Nodes of this iteration over the nodes of the one before.
+    ebf: float
+    # Share of the beta cutoffs that came from the first move searched, how good the move ordering is.
+    first_move_cutoff_rate: float
+
+    def __str__(self) -> str:
+        return (
+            f"depth {self.depth} nodes {self.nodes} time {self.time:.2f}s re-searches {self.re_searches} "
+            f"tt hits {self.tt_hits} ebf {self.ebf:.2f} first move cutoffs {self.first_move_cutoff_rate:.1%}"
+        )
+
+
+class SearchResult(NamedTuple):
+    """Outcome of the last finished iteration."""
+
+    move: int
+    score: int
+    depth: int
+    pv: List[int]
+    nodes: int
+    time: float
+    # Statistics of the iteration the result comes from.
+    stats: Optional[IterationStats] = None
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.time if self.time > 0 else 0.0
+
+    def __str__(self) -> str:
+        pv_str = " ".join(Move.to_str(move) for move in self.pv)
+        return f"depth {self.depth} score {self.score} nodes {self.nodes} time {self.time:.2f}s nps {self.nps:.0f} pv {pv_str}"
+
+
+class SearchOptions(NamedTuple):
+    """The selective parts of the search, each can be turned off to measure what it brings."""
+
+    # Principal variation search, zero window searches after the first move.
+    pvs: bool = True
+    null_move: bool = True
+    # Late move reductions.
+    lmr: bool = True
+    futility: bool = True
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when a limit is hit, it unwinds the search back to the root."""
+
+
+class Search:
+    """Searches a board in place, the board is back in its starting position when a search returns."""
+
+    def __init__(
+        self,
+        board: Board,
+        tt: Optional[TranspositionTable] = None,
+        options: SearchOptions = SearchOptions(),
+        time_manager: Optional[TimeManager] = None,
+        stop_event: Optional[Event] = None,
+        tablebases: Optional[Tablebases] = None,
+    ):
+        """Set a search up.
+
+        Parameters
+        ----------
+        board : Board
+            The board to search, it is played on and restored.
+        tt : TranspositionTable, optional
+            Table to share, a new 16 MB one by default.
+        options : SearchOptions
+            Which pruning and reduction techniques to use, all of them by default.
+        time_manager : TimeManager, optional
+            Budgets the searches limited by a clock, one with the default overhead by default.
+        stop_event : multiprocessing.Event, optional
+            Stops the search like stop does when it is set, for another process to stop it.
+        tablebases : Tablebases, optional
+            Endgame tables to probe, none by default.
+        """
+        self.board: Board = board
+        self.options: SearchOptions = options
+        self.time_manager: TimeManager = time_manager if time_manager is not None else TimeManager()
+        self.stop_event: Optional[Event] = stop_event
+        self.tablebases: Optional[Tablebases] = tablebases
+        self.movegen: MoveGenerator = MoveGenerator(board)
+        self.tt: TranspositionTable = tt if tt is not None else TranspositionTable()
+        # Lives as long as the search, the pawn structures stay valid from one search to the next.
+        self.pawn_table: PawnHashTable = PawnHashTable()
+        # One move buffer per ply so the move lists are not reallocated all the time.
+        self.move_buffers: List[array] = [array("H") for _ in range(MAX_PLY + 1)]
+        self.pv_table: List[List[int]] = [[] for _ in range(MAX_PLY + 1)]
+        self.ordering: MoveOrdering = MoveOrdering(MAX_PLY)
+
+        self.limits: SearchLimits = SearchLimits()
+        self.nodes: int = 0
+        self.cutoffs: int = 0
+        self.first_move_cutoffs: int = 0
+        # Statistics of every finished depth of the last search.
+        self.iterations: List[IterationStats] = []
+        self.start_time: float = 0.0
+        # perf_counter times the search stops at, None without a time limit.
+        self.soft_deadline: Optional[float] = None
+        self.hard_deadline: Optional[float] = None
+        self.stopped: bool = False
+
+    def stop(self) -> None:
+        """Ask a running search to stop, it returns the result of the last finished depth."""
+        self.stopped = True
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def search(
+        self,
+        limits: SearchLimits = SearchLimits(),
+        on_iteration: Optional[Callable[[SearchResult], None]] = None,
+        skip_depth: Optional[Callable[[int], bool]] = None,
+    ) -> SearchResult:
+        """Search the board with iterative deepening.
+
+        Parameters
+        ----------
+        limits : SearchLimits
+            Depth, node and time budget.
+        on_iteration : Callable[[SearchResult], None], optional
+            Called with the result of every finished depth.
+        skip_depth : Callable[[int], bool], optional
+            The depths it is true for are left out, except for the last one the limits allow.  The
+            helpers of a parallel search use it to stay on other depths than the main worker.
+
+        Returns
+        -------
+        SearchResult
+            Best move (0 when there is no legal move), its score, the depth reached, the pv and the nodes searched.
+        """
+        board = self.board
+        self.limits = limits
+        self.nodes = 0
+        self.iterations = []
+        self.stopped = False
+        self.start_time = time.perf_counter()
+        self._set_deadlines(limits)
+        self.tt.new_search()
+        self.ordering.new_search()
+
+        root_moves = self.movegen.get_all_moves()
+        if not root_moves:
+            score = -MATE_SCORE if self.movegen.is_king_in_check() else DRAW_SCORE
+            return SearchResult(0, score, 0, [], 0, 0.0)
+
+        result = SearchResult(root_moves[0], 0, 0, [root_moves[0]], 0, 0.0)
+        root_undo = len(board.undo_stack)
+        max_depth = min(limits.depth, MAX_PLY)
+        for depth in range(1, max_depth + 1):
+            if skip_depth is not None and depth < max_depth and skip_depth(depth):
+                continue
+            iteration_nodes = self.nodes
+            iteration_start = self.elapsed()
+            tt_hits = self.tt.hits
+            self.cutoffs = self.first_move_cutoffs = 0
+            try:
+                score, re_searches = self._aspiration(depth, result.score)
+            except SearchAborted:
+                # Take back the moves the search was in the middle of.
+                while len(board.undo_stack) > root_undo:
+                    board.unmake_move()
+                break
+            iteration_nodes = self.nodes - iteration_nodes
+            previous_nodes = self.iterations[-1].nodes if self.iterations else 0
+            stats = IterationStats(
+                depth,
+                iteration_nodes,
+                self.elapsed() - iteration_start,
+                re_searches,
+                self.tt.hits - tt_hits,
+                iteration_nodes / previous_nodes if previous_nodes else 0.0,
+                self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            )
+            self.iterations.append(stats)
+            pv = self.pv_table[0]
+            result = SearchResult(pv[0], score, depth, list(pv), self.nodes, self.elapsed(), stats)
+            if on_iteration is not None:
+                on_iteration(result)
+            if abs(score) >= MATE_BOUND and MATE_SCORE - abs(score) <= depth:
+                # A mate within the horizon, searching deeper will not change it.
+                break
+            if self.soft_deadline is not None and time.perf_counter() >= self.soft_deadline:
+                break
+        return result._replace(nodes=self.nodes, time=self.elapsed())
+
+    def _aspiration(self, depth: int, previous_score: int) -> Tuple[int, int]:
+        """Search the root in a window around the score of the previous depth, widening it until the score falls inside.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The exact score and the number of re-searches it took.
+        """
+        if depth < ASPIRATION_MIN_DEPTH or abs(previous_score) >= MATE_BOUND:
+            return self._negamax(depth, 0, -INFINITY, INFINITY), 0
+        delta = ASPIRATION_WINDOW
+        alpha = max(previous_score - delta, -INFINITY)
+        beta = min(previous_score + delta, INFINITY)
+        re_searches = 0
+        while True:
+            score = self._negamax(depth, 0, alpha, beta)
+            if score <= alpha and alpha > -INFINITY:
+                # Failed low, the score is only an upper bound.
+                alpha = max(score - delta, -INFINITY)
+            elif score >= beta and beta < INFINITY:
+                # Failed high, the score is only a lower bound.
+                beta = min(score + delta, INFINITY)
+            else:
+                return score, re_searches
+            re_searches += 1
+            delta *= 2
+
+    def _set_deadlines(self, limits: SearchLimits) -> None:
+        """Combine the fixed time limits and the budget of the clock, whichever is tighter."""
+        soft = limits.soft_time
+        hard = limits.time
+        if limits.clock is not None:
+            budget = self.time_manager.budget(limits.clock)
+            soft = budget.soft if soft is None else min(soft, budget.soft)
+            hard = budget.hard if hard is None else min(hard, budget.hard)
+        if soft is not None and hard is not None:
+            soft = min(soft, hard)
+        self.soft_deadline = None if soft is None else self.start_time + soft
+        self.hard_deadline = None if hard is None else self.start_time + hard
+
+    def _check_limits(self) -> None:
+        if self.stopped or (self.limits.nodes is not None and self.nodes >= self.limits.nodes):
+            raise SearchAborted
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.stopped = True
+            raise SearchAborted
+        if self.hard_deadline is not None and time.perf_counter() >= self.hard_deadline:
+            self.stopped = True
+            raise SearchAborted
+
+    def _is_draw(self) -> bool:
+        """Fifty move rule or a repetition since the last capture or pawn move."""
+        board = self.board
+        if board.half_move_clock >= 100:
+            return True
+        key = board.key
+        history = board.key_history
+        # Only the positions with the same side to move can repeat.
+        for back in range(2, min(board.half_move_clock, len(history)) + 1, 2):
+            if history[-back] == key:
+                return True
+        return False
+
+    def _negamax(self, depth: int, ply: int, alpha: int, beta: int, allow_null: bool = True) -> int:
+        """Score of the position for the side to move, exact when it lies between alpha and beta.
+
+        allow_null is off right after a null move, two passes in a row prove nothing.
+        """
+        self.nodes += 1
+        if not self.nodes & (CHECK_EVERY - 1) or (self.limits.nodes is not None and self.nodes >= self.limits.nodes):
+            self._check_limits()
+        pv_table = self.pv_table
+        pv_table[ply] = []
+        board = self.board
+
+        if ply:
+            if self._is_draw():
+                return DRAW_SCORE
+            # Mate distance pruning, a shorter mate was already found elsewhere.
+            alpha = max(alpha, -MATE_SCORE + ply)
+            beta = min(beta, MATE_SCORE - ply - 1)
+            if alpha >= beta:
+                return alpha
+            if self.tablebases is not None and board.occupied.bit_count() <= MAX_PIECES:
+                value = self.tablebases.probe(board)
+                if value is not None:
+                    return tablebase_score(value, ply)
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(ply, alpha, beta)
+
+        key = board.key
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, bound, tt_move = entry
+            if ply and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if (
+                    bound == Bound.EXACT
+                    or (bound == Bound.LOWER and tt_score >= beta)
+                    or (bound == Bound.UPPER and tt_score <= alpha)
+                ):
+                    return tt_score
+
+        moves = self.movegen.get_all_moves(self.move_buffers[ply])
+        in_check = self.movegen.is_king_in_check()
+        if not moves:
+            return -MATE_SCORE + ply if in_check else DRAW_SCORE
+
+        options = self.options
+        pv_node = beta - alpha > 1
+        futile = False
+        if not pv_node and not in_check:
+            static_eval = Evaluation.evaluate(board, self.pawn_table)
+            if (
+                options.null_move
+                and allow_null
+                and depth >= NULL_MOVE_MIN_DEPTH
+                and static_eval >= beta
+                and has_non_pawn_material(board, board.color_to_move)
+            ):
+                # Give the opponent a free move, if we are still above beta the real moves will be too.
+                board.make_null_move()
+                score = -self._negamax(depth - 1 - NULL_MOVE_REDUCTION - depth // 6, ply + 1, -beta, -beta + 1, False)
+                board.unmake_move()
+                if score >= beta:
+                    # Do not trust a mate found by passing.
+                    return beta if score >= MATE_BOUND else score
+            futile = (
+                options.futility
+                and depth < len(FUTILITY_MARGINS)
+                and abs(alpha) < MATE_BOUND
+                and static_eval + FUTILITY_MARGINS[depth] <= alpha
+            )
+
+        ordering = self.ordering
+        alpha_orig = alpha
+        best_score = -INFINITY
+        best_move = 0
+        tried_quiets = []
+        for move_count, move in enumerate(ordering.ordered_moves(board, moves, tt_move, ply)):
+            is_quiet = ordering.is_quiet(board, move)
+            board.make_move(*Move.decode(move))
+            gives_check = self.movegen.is_king_in_check()
+            if futile and is_quiet and move_count and not gives_check:
+                # Too far below alpha for a quiet move to make up for it this close to the horizon.
+                board.unmake_move()
+                continue
+
+            if move_count == 0:
+                score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+            else:
+                reduction = 0
+                if (
+                    options.lmr
+                    and is_quiet
+                    and depth >= LMR_MIN_DEPTH
+                    and move_count >= LMR_FULL_MOVES
+                    and not in_check
+                    and not gives_check
+                ):
+                    # The later a move comes in the ordering the less likely it is to matter.
+                    reduction = min(LMR_REDUCTIONS[min(depth, MAX_PLY)][min(move_count, LMR_MAX_MOVES)], depth - 2)
+                # A late move that beats alpha at the reduced depth is searched again at full depth.
+                if reduction:
+                    score = -self._negamax(depth - 1 - reduction, ply + 1, -alpha - 1, -alpha)
+                    full_depth = score > alpha
+                else:
+                    full_depth = True
+                if full_depth:
+                    if options.pvs:
+                        # Only try to prove the move is worse than the best one, search it properly if that fails.
+                        score = -self._negamax(depth - 1, ply + 1, -alpha - 1, -alpha)
+                        if alpha < score < beta:
+                            score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+                    else:
+                        score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+            board.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    pv_table[ply] = [move] + pv_table[ply + 1]
+                    if score >= beta:
+                        self.cutoffs += 1
+                        if not move_count:
+                            self.first_move_cutoffs += 1
+                        if is_quiet:
+                            ordering.update_quiet(board, move, depth, ply, tried_quiets)
+                        break
+            if is_quiet:
+                tried_quiets.append(move)
+
+        if best_score >= beta:
+            bound = Bound.LOWER
+        elif best_score > alpha_orig:
+            bound = Bound.EXACT
+        else:
+            bound = Bound.UPPER
+        self.tt.store(key, depth, score_to_tt(best_score, ply), bound, best_move)
+        return best_score
+
+    def _quiescence(self, ply: int, alpha: int, beta: int) -> int:
+        """Search the captures until the position is quiet.
+
+        The side to move may stand pat on the static evaluation unless it is in
+        check, then every evasion is searched so mates are still found.
+        """
+        self.nodes += 1
+        if not self.nodes & (CHECK_EVERY - 1) or (self.limits.nodes is not None and self.nodes >= self.limits.nodes):
+            self._check_limits()
+        self.pv_table[ply] = []
+        board = self.board
+        if ply >= MAX_PLY:
+            return Evaluation.evaluate(board, self.pawn_table)
+
+        if self.movegen.is_king_in_check():
+            in_check = True
+            moves = self.movegen.get_all_moves(self.move_buffers[ply])
+            if not moves:
+                return -MATE_SCORE + ply
+            best_score = -INFINITY
+            ordered = self.ordering.ordered_moves(board, moves, 0, ply)
+        else:
+            in_check = False
+            best_score = Evaluation.evaluate(board, self.pawn_table)
+            if best_score >= beta:
+                return best_score
+            alpha = max(alpha, best_score)
+            moves = self.movegen.get_all_moves(self.move_buffers[ply], captures_only=True)
+            ordered = self.ordering.ordered_captures(board, moves)
+
+        for move in ordered:
+            if not in_check and static_exchange(board, move) < 0:
+                # A losing capture, standing pat is at least as good.
+                continue
+            board.make_move(*Move.decode(move))
+            score = -self._quiescence(ply + 1, -beta, -alpha)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if score >= beta:
+                        break
+        return best_score
+
+
+def has_non_pawn_material(board: Board, color: int) -> bool:
+    """Whether the side has a piece besides its king and pawns, without one zugzwang is too likely for a null move."""
+    pieces = board.all_pieces[color]
+    return bool(pieces[Piece.KNIGHT] or pieces[Piece.BISHOP] or pieces[Piece.ROOK] or pieces[Piece.QUEEN])
+
+
+def tablebase_score(value: int, ply: int) -> int:
+    """Search score of a tablebase value (see chess.ai.tablebase) found at a ply."""
+    if value > 0:
+        return MATE_SCORE - ply - value
+    if value < 0:
+        return -MATE_SCORE + ply - value - 1
+    return DRAW_SCORE
+
+
+def score_to_tt(score: int, ply: int) -> int:
+    """Mate scores are stored as the distance from the node, not from the root."""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    """Turn a stored mate score back into the distance from the root."""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
@@ -0,0 +1,85 @@
+"""Static exchange evaluation.
+
+Plays out every capture on the target square of a move, always with the
+least valuable attacker, and scores the sequence with both sides free to
+stop capturing once it would lose them material.  Pieces behind the
+attackers (x-rays) join in as the ones in front of them are used up.
+"""
+from typing import Dict
+
+from chess.board import Board
+from chess.moves.attacks import KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS
+from chess.moves.move import Move
+from chess.moves.sliders import bishop_attacks, rook_attacks
+from chess.pieces.piece import Piece
+
+SEE_VALUES: Dict[int, int] = {
+    Piece.EMPTY: 0,
+    Piece.PAWN: 100,
+    Piece.KNIGHT: 320,
+    Piece.BISHOP: 330,
+    Piece.ROOK: 500,
+    Piece.QUEEN: 900,
+    Piece.KING: 20000,
+}
+# Least valuable attacker first.
+ATTACKER_ORDER = (Piece.PAWN, Piece.KNIGHT, Piece.BISHOP, Piece.ROOK, Piece.QUEEN, Piece.KING)
+
+
+def attackers_to(board: Board, sq: int, occupied: int) -> int:
+    """Bitboard of the pieces of both colours attacking sq, the sliders are blocked by the given occupancy."""
+    bitboards = board.bitboards
+    queens = bitboards[Piece.WHITE | Piece.QUEEN] | bitboards[Piece.BLACK | Piece.QUEEN]
+    return (
+        KNIGHT_ATTACKS[sq] & (bitboards[Piece.WHITE | Piece.KNIGHT] | bitboards[Piece.BLACK | Piece.KNIGHT])
+        | KING_ATTACKS[sq] & (bitboards[Piece.WHITE | Piece.KING] | bitboards[Piece.BLACK | Piece.KING])
+        | PAWN_ATTACKS[Piece.BLACK][sq] & bitboards[Piece.WHITE | Piece.PAWN]
+        | PAWN_ATTACKS[Piece.WHITE][sq] & bitboards[Piece.BLACK | Piece.PAWN]
+        | rook_attacks(sq, occupied) & (bitboards[Piece.WHITE | Piece.ROOK] | bitboards[Piece.BLACK | Piece.ROOK] | queens)
+        | bishop_attacks(sq, occupied) & (bitboards[Piece.WHITE | Piece.BISHOP] | bitboards[Piece.BLACK | Piece.BISHOP] | queens)
+    )
+
+
+def static_exchange(board: Board, move: int) -> int:
+    """Material the side to move wins (negative when it loses) by playing the move and the exchange after it."""
+    bitboards = board.bitboards
+    occupancy = board.occupancy
+    start_sq = move & Move.SQUARE_MASK
+    end_sq = (move >> Move.END_SHIFT) & Move.SQUARE_MASK
+    flag = move >> Move.FLAG_SHIFT
+
+    occupied = board.occupied ^ 1 << start_sq
+    gain = [SEE_VALUES[board.squares[end_sq] & Piece.TYPE_MASK]]
+    attacker_value = SEE_VALUES[board.squares[start_sq] & Piece.TYPE_MASK]
+    if flag == Move.EN_PASSANT_CAPTURE:
+        gain[0] = SEE_VALUES[Piece.PAWN]
+        occupied ^= 1 << (end_sq + 8 if board.color_to_move == Piece.WHITE else end_sq - 8)
+    elif prom_type := Move.PROMOTION_TYPES[flag]:
+        gain[0] += SEE_VALUES[prom_type] - SEE_VALUES[Piece.PAWN]
+        attacker_value = SEE_VALUES[prom_type]
+
+    attackers = attackers_to(board, end_sq, occupied) & occupied
+    side = Piece.get_enemy_color(board.color_to_move)
+    while True:
+        side_attackers = attackers & occupancy[side]
+        if not side_attackers:
+            break
+        for ptype in ATTACKER_ORDER:
+            piece_bb = side_attackers & bitboards[side | ptype]
+            if piece_bb:
+                break
+        if ptype == Piece.KING and attackers & occupancy[Piece.get_enemy_color(side)]:
+            # The king can not take a defended piece.
+            break
+        # What the side capturing now is up if the exchange stopped here.
+        gain.append(attacker_value - gain[-1])
+        occupied ^= piece_bb & -piece_bb
+        # Sliders behind the piece that just moved can now see the square.
+        attackers = attackers_to(board, end_sq, occupied) & occupied
+        attacker_value = SEE_VALUES[ptype]
+        side = Piece.get_enemy_color(side)
+
+    # Back from the end, every side either stops or goes on capturing, whichever is better for it.
+    for depth in range(len(gain) - 1, 0, -1):
+        gain[depth - 1] = -max(-gain[depth - 1], gain[depth])
+    return gain[0]
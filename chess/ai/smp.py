@@ -0,0 +1,112 @@
+"""Lazy SMP, a parallel search over several processes.
+
+Threads do not help a pure Python search because of the GIL, so every
+worker is a process of its own.  All of them search the same root with the
+ordinary iterative deepening and share nothing but the transposition table,
+which lives in shared memory.  The first worker searches every depth, the
+helpers leave some of them out following the SKIP_SIZE / SKIP_PHASE pattern:
+helper i goes through the depths in runs of SKIP_SIZE[i], searching every
+other run, with its runs shifted by SKIP_PHASE[i].  Skipping the depths
+between its runs takes a helper ahead of the first worker, so the helpers
+stay spread over the depths around it in every iteration instead of all
+searching the same one.  What one worker finds out about a position is
+then picked up by the others through the table, which is what makes the
+search faster; the workers never wait for each other.
+
+The first worker to finish stops the others, the result of the deepest
+finished iteration is played.
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from typing import List, Optional, Tuple
+
+from chess.ai.search import Search, SearchLimits, SearchResult
+from chess.ai.transposition import SharedTranspositionTable
+from chess.board import Board
+
+# Per helper, the length of the runs of depths it searches or skips and the offset of its runs.
+SKIP_SIZE = (1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4)
+SKIP_PHASE = (0, 1, 0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4, 5, 6, 7)
+
+# The table and the stop event of a worker process, they live as long as the process.
+_worker_tt: Optional[SharedTranspositionTable] = None
+_worker_stop = None
+
+
+def _init_worker(tt_name: str, hash_mb: float, stop_event) -> None:
+    global _worker_tt, _worker_stop
+    _worker_tt = SharedTranspositionTable(hash_mb, tt_name)
+    _worker_stop = stop_event
+
+
+def skips_depth(worker: int, depth: int) -> bool:
+    """Whether a worker leaves a depth of the iterative deepening out, the first worker never does."""
+    if not worker:
+        return False
+    helper = (worker - 1) % len(SKIP_SIZE)
+    return (depth + SKIP_PHASE[helper]) // SKIP_SIZE[helper] % 2 == 1
+
+
+def _search_task(fen: str, key_history: List[int], limits: SearchLimits, worker: int) -> Tuple[int, SearchResult]:
+    """Worker side of the parallel search, the helpers skip depths as skips_depth says."""
+    board = Board(fen)
+    # Positions before the root, for the repetitions.
+    board.key_history = list(key_history)
+    search = Search(board, tt=_worker_tt, stop_event=_worker_stop)
+    return worker, search.search(limits, skip_depth=partial(skips_depth, worker))
+
+
+class LazySmp:
+    """A pool of search processes sharing one transposition table, use it as a context manager or close it."""
+
+    def __init__(self, workers: Optional[int] = None, hash_mb: float = 64):
+        """Start the worker processes.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of processes, defaults to the number of CPUs.
+        hash_mb : float
+            Size of the shared transposition table.
+        """
+        self.workers: int = workers or os.cpu_count() or 1
+        self.tt: SharedTranspositionTable = SharedTranspositionTable(hash_mb)
+        self.stop_event = multiprocessing.Event()
+        self.pool: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.tt.name, hash_mb, self.stop_event),
+        )
+
+    def search(self, board: Board, limits: SearchLimits = SearchLimits()) -> SearchResult:
+        """Search the board with all the workers, the board itself is not touched.
+
+        Returns
+        -------
+        SearchResult
+            The result of the worker that got the deepest, the nodes are the ones of all workers together.
+        """
+        self.stop_event.clear()
+        fen = board.get_fen()
+        futures = [self.pool.submit(_search_task, fen, board.key_history, limits, worker) for worker in range(self.workers)]
+        wait(futures, return_when=FIRST_COMPLETED)
+        # Once one worker is done the others only burn time, the result they have is the last depth they finished.
+        self.stop_event.set()
+        results = sorted(future.result() for future in futures)
+        nodes = sum(result.nodes for _, result in results)
+        best = max((result for _, result in results), key=lambda result: result.depth)
+        return best._replace(nodes=nodes)
+
+    def close(self) -> None:
+        """Stop the workers and free the shared table."""
+        self.stop_event.set()
+        self.pool.shutdown()
+        self.tt.unlink()
+
+    def __enter__(self) -> "LazySmp":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
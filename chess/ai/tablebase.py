@@ -0,0 +1,585 @@
+"""Endgame tablebases for up to four pieces, generated by retrograde analysis.
+
+A table holds, for every position of one material set such as KQK or KRKN,
+whether the side to move wins, draws or loses and in how many plies the
+game ends in mate.  Generate them offline with
+
+    python -m chess.ai.tablebase KQK KRK KPK KQKR --dir tablebases
+
+which also builds the smaller tables a capture or a promotion leads into.
+A Search given a Tablebases reader looks the positions with few enough
+pieces up instead of searching them.
+
+Positions are not stored as FENs but as an index: the side to move and the
+square of every piece, in the order the material name lists them (white
+king, white pieces, black king, black pieces, with the piece codes of
+Piece).  The board is first turned so the white king lies in a small part
+of it: the a1-d1-d4 triangle when there are no pawns (8 symmetries), the
+a-d files when there are (only the left-right mirror keeps the pawns
+moving the right way).  Only the material with the stronger side as white
+is generated, the other colour is probed by swapping the colours.
+
+Generation works on whole arrays of indices with NumPy:
+
+    * every index is decoded, the impossible positions (two pieces on a
+      square, pawns on the back rows, the side not to move in check) are
+      marked invalid,
+    * the legal moves of all the valid positions are generated once, the
+      moves staying in the table are kept as (parent, child) index pairs,
+      captures and promotions lead into smaller tables and are looked up
+      there straight away,
+    * the positions are then resolved by distance: at pass d a position is
+      won in d plies when one of its moves leads to a loss in d - 1 plies,
+      and lost in d plies when all of its moves lead to wins in at most
+      d - 1 plies.  Whatever is left when nothing changes any more is a
+      draw.
+
+A table is a .npy file of one signed byte per position (two when a mate
+takes too long for one), read through a memory map so probing costs a
+single lookup.  Values are for the side to move: 0 a draw, n > 0 a win
+with mate in n plies, -(n + 1) a loss mated in n plies; the smallest value
+of the type marks the invalid indices.
+
+Castling rights, en passant captures and the fifty-move rule are left out,
+positions with castling rights or an en passant capture are not probed.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from chess.ai.evaluation import PIECE_VALUES
+from chess.board import Board
+from chess.moves.attacks import KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS
+from chess.moves.sliders import BETWEEN, bishop_attacks, queen_attacks, rook_attacks
+from chess.pieces.piece import Piece
+
+MAX_PIECES = 4
+CHUNK_SIZE = 1 << 18
+PIECE_LETTERS: Dict[int, str] = {Piece.QUEEN: "Q", Piece.ROOK: "R", Piece.BISHOP: "B", Piece.KNIGHT: "N", Piece.PAWN: "P"}
+LETTER_TYPES: Dict[str, int] = {letter: ptype for ptype, letter in PIECE_LETTERS.items()}
+PROMOTION_TYPES = (Piece.QUEEN, Piece.ROOK, Piece.BISHOP, Piece.KNIGHT)
+SLIDERS = frozenset((Piece.BISHOP, Piece.ROOK, Piece.QUEEN))
+BOTH_COLORS = Piece.WHITE | Piece.BLACK
+
+_U64_ONE = np.uint64(1)
+_SQUARE_BITS = np.array([1 << sq for sq in range(64)], dtype=np.uint64)
+_BETWEEN = np.array(BETWEEN, dtype=np.uint64)
+# Attacks from every square on an empty board, the sliders are blocked through _BETWEEN.
+_ATTACKS: Dict[int, np.ndarray] = {
+    Piece.KING: np.array(KING_ATTACKS, dtype=np.uint64),
+    Piece.KNIGHT: np.array(KNIGHT_ATTACKS, dtype=np.uint64),
+    Piece.BISHOP: np.array([bishop_attacks(sq, 0) for sq in range(64)], dtype=np.uint64),
+    Piece.ROOK: np.array([rook_attacks(sq, 0) for sq in range(64)], dtype=np.uint64),
+    Piece.QUEEN: np.array([queen_attacks(sq, 0) for sq in range(64)], dtype=np.uint64),
+}
+_PAWN_ATTACKS: Dict[int, np.ndarray] = {color: np.array(PAWN_ATTACKS[color], dtype=np.uint64) for color in (Piece.WHITE, Piece.BLACK)}
+PAWN_STEP: Dict[int, int] = {Piece.WHITE: -8, Piece.BLACK: 8}
+# Rows a pawn of the colour makes its double step from and promotes on.
+PAWN_START_ROW: Dict[int, int] = {Piece.WHITE: 6, Piece.BLACK: 1}
+PROMOTION_ROW: Dict[int, int] = {Piece.WHITE: 0, Piece.BLACK: 7}
+
+
+def _targets(attacks: List[int]) -> np.ndarray:
+    """The attacked squares of every square as a (64, most) array padded with -1."""
+    lists = [[sq for sq in range(64) if bb >> sq & 1] for bb in attacks]
+    targets = np.full((64, max(map(len, lists))), -1, dtype=np.int64)
+    for sq, squares in enumerate(lists):
+        targets[sq, :len(squares)] = squares
+    return targets
+
+
+_TARGETS: Dict[int, np.ndarray] = {ptype: _targets([int(bb) for bb in bbs]) for ptype, bbs in _ATTACKS.items()}
+
+
+def _symmetries() -> np.ndarray:
+    """The 8 symmetries of the board as a (8, 64) square mapping, the identity first and the left-right mirror second."""
+    transforms = []
+    for transpose in (False, True):
+        for flip_row in (False, True):
+            for flip_col in (False, True):
+                mapping = []
+                for sq in range(64):
+                    row, col = divmod(sq, 8)
+                    if transpose:
+                        row, col = col, row
+                    if flip_row:
+                        row = 7 - row
+                    if flip_col:
+                        col = 7 - col
+                    mapping.append(row * 8 + col)
+                transforms.append(mapping)
+    return np.array(transforms, dtype=np.int64)
+
+
+SYMMETRIES = _symmetries()
+
+
+def _king_region(pawns: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Where the white king is put and how to get it there.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        The region squares, the region index of each square (-1 outside of it)
+        and the symmetry that takes a king on each square into the region.
+    """
+    if pawns:
+        in_region = [sq & 7 <= 3 for sq in range(64)]
+        # The identity and the left-right mirror.
+        allowed = (0, 1)
+    else:
+        # a1-d1-d4: the bottom four rows, files a-d, on or below the diagonal.
+        in_region = [sq >> 3 >= 4 and sq & 7 <= 3 and sq & 7 >= 7 - (sq >> 3) for sq in range(64)]
+        allowed = tuple(range(len(SYMMETRIES)))
+    squares = np.array([sq for sq in range(64) if in_region[sq]], dtype=np.int64)
+    region_index = np.full(64, -1, dtype=np.int64)
+    region_index[squares] = np.arange(len(squares))
+    king_symmetry = np.array(
+        [next(t for t in allowed if in_region[SYMMETRIES[t, sq]]) for sq in range(64)], dtype=np.int64
+    )
+    return squares, region_index, king_symmetry
+
+
+def material_name(pieces: Sequence[int]) -> str:
+    """Name of the material of some pieces, like KQKR: the white pieces then the black ones, strongest first."""
+    sides = []
+    for color in (Piece.WHITE, Piece.BLACK):
+        types = sorted((piece & Piece.TYPE_MASK for piece in pieces if piece & color and piece & Piece.TYPE_MASK != Piece.KING), reverse=True)
+        sides.append("K" + "".join(PIECE_LETTERS[ptype] for ptype in types))
+    return "".join(sides)
+
+
+def canonical_name(name: str) -> Tuple[str, bool]:
+    """The name the table of some material is stored under, and whether its colours are swapped in it."""
+    white, black = _split_name(name)
+    if _strength(black) > _strength(white):
+        return black + white, True
+    return white + black, False
+
+
+def mate_plies(values: np.ndarray) -> np.ndarray:
+    """Plies to the mate of some table values, won or lost, 0 for the draws."""
+    values = values.astype(np.int16)
+    return np.where(values > 0, values, np.maximum(-values - 1, 0))
+
+
+def _split_name(name: str) -> Tuple[str, str]:
+    second_king = name.find("K", 1)
+    if not name.startswith("K") or second_king < 0 or any(letter not in LETTER_TYPES for letter in name[1:second_king] + name[second_king + 1:]):
+        raise ValueError(f"Not a material name: {name!r}, expected something like KQK or KRKN.")
+    return name[:second_king], name[second_king:]
+
+
+def _strength(side: str) -> Tuple[int, str]:
+    return sum(PIECE_VALUES[LETTER_TYPES[letter]] for letter in side[1:]), side
+
+
+class TableLayout:
+    """How the positions of one material set map to indices."""
+
+    def __init__(self, name: str):
+        """Work the layout out from the material name.
+
+        Parameters
+        ----------
+        name : str
+            The canonical material name, see canonical_name.
+        """
+        white, black = _split_name(name)
+        self.name: str = name
+        self.kinds: Tuple[int, ...] = tuple(
+            color | (Piece.KING if letter == "K" else LETTER_TYPES[letter])
+            for color, side in ((Piece.WHITE, white), (Piece.BLACK, black))
+            for letter in side
+        )
+        if len(self.kinds) > MAX_PIECES:
+            raise ValueError(f"{name} has more than {MAX_PIECES} pieces.")
+        self.pawns: bool = "P" in name
+        self.region, self.region_index, self.king_symmetry = _king_region(self.pawns)
+        # Side to move, white king in the region, then any square for every other piece.
+        self.size: int = 2 * len(self.region) * 64 ** (len(self.kinds) - 1)
+
+    def encode(self, stm: np.ndarray, squares: Sequence[np.ndarray]) -> np.ndarray:
+        """Indices of positions given the side to move (0 white, 1 black) and the square of every slot."""
+        symmetry = self.king_symmetry[squares[0]]
+        index = stm.astype(np.int64) * len(self.region) + self.region_index[SYMMETRIES[symmetry, squares[0]]]
+        for sq in squares[1:]:
+            index = index * 64 + SYMMETRIES[symmetry, sq]
+        return index
+
+    def decode(self, index: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Side to move and the square of every slot of some indices, the inverse of encode."""
+        squares = []
+        for _ in self.kinds[1:]:
+            squares.append(index & 63)
+            index = index >> 6
+        squares.append(self.region[index % len(self.region)])
+        return index // len(self.region), squares[::-1]
+
+
+class Tablebases:
+    """Reader of the tables in a directory, they are memory mapped the first time they are needed."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory: Path = Path(directory)
+        self.tables: Dict[str, Optional[np.ndarray]] = {}
+        self.layouts: Dict[str, TableLayout] = {}
+        self.hits: int = 0
+
+    def path(self, name: str) -> Path:
+        return self.directory / f"{name}.npy"
+
+    def layout(self, name: str) -> TableLayout:
+        if name not in self.layouts:
+            self.layouts[name] = TableLayout(name)
+        return self.layouts[name]
+
+    def table(self, name: str) -> Optional[np.ndarray]:
+        """The values of a canonical material set, None when it was not generated."""
+        if name not in self.tables:
+            path = self.path(name)
+            self.tables[name] = np.load(path, mmap_mode="r") if path.exists() else None
+        return self.tables[name]
+
+    def lookup(self, kinds: Sequence[int], stm: np.ndarray, squares: Sequence[np.ndarray]) -> Optional[np.ndarray]:
+        """Values of some positions of the same material.
+
+        Parameters
+        ----------
+        kinds : Sequence[int]
+            Colour and type of every piece, in any order.
+        stm : np.ndarray
+            Side to move of every position, 0 for white and 1 for black.
+        squares : Sequence[np.ndarray]
+            Square of each piece of kinds in every position.
+
+        Returns
+        -------
+        np.ndarray, optional
+            The values as int16, see the module docstring, None without a table.
+        """
+        if len(kinds) == 2:
+            # Bare kings.
+            return np.zeros(len(stm), dtype=np.int16)
+        name, swapped = canonical_name(material_name(kinds))
+        table = self.table(name)
+        if table is None:
+            return None
+        if swapped:
+            kinds = [kind ^ BOTH_COLORS for kind in kinds]
+            squares = [sq ^ 56 for sq in squares]
+            stm = stm ^ 1
+        layout = self.layout(name)
+        unused = list(range(len(kinds)))
+        ordered = []
+        for kind in layout.kinds:
+            slot = next(slot for slot in unused if kinds[slot] == kind)
+            unused.remove(slot)
+            ordered.append(squares[slot])
+        return np.asarray(table[layout.encode(stm, ordered)], dtype=np.int16)
+
+    def probe(self, board: Board) -> Optional[int]:
+        """Value of the position of a board for the side to move, None when it is not in a table."""
+        if board.castling or board.occupied.bit_count() > MAX_PIECES:
+            return None
+        if board.en_passant is not None:
+            # The square is set after every double step, it only matters when a pawn can take on it.
+            ep_sq = board.en_passant[0] * 8 + board.en_passant[1]
+            mover = board.color_to_move
+            if PAWN_ATTACKS[Piece.get_enemy_color(mover)][ep_sq] & board.bitboards[mover | Piece.PAWN]:
+                return None
+        kinds = []
+        squares = []
+        for kind, bb in board.bitboards.items():
+            while bb:
+                kinds.append(kind)
+                squares.append(np.array([(bb & -bb).bit_length() - 1]))
+                bb &= bb - 1
+        values = self.lookup(kinds, np.array([board.color_to_move >> 9]), squares)
+        if values is None:
+            return None
+        self.hits += 1
+        return int(values[0])
+
+
+def _attacks(kind: int, frm: np.ndarray, target: np.ndarray, occupied: np.ndarray) -> np.ndarray:
+    """Whether a piece of the kind on frm attacks target, for arrays of positions."""
+    ptype = kind & Piece.TYPE_MASK
+    table = _PAWN_ATTACKS[kind & Piece.COLOR_MASK] if ptype == Piece.PAWN else _ATTACKS[ptype]
+    hit = (table[frm] >> target.astype(np.uint64)) & _U64_ONE != 0
+    if ptype in SLIDERS:
+        hit &= _BETWEEN[frm, target] & occupied == 0
+    return hit
+
+
+class TablebaseGenerator:
+    """Builds the tables by retrograde analysis and writes them next to each other in a directory."""
+
+    def __init__(self, directory: Union[str, Path], verbose: bool = True):
+        self.tablebases: Tablebases = Tablebases(directory)
+        self.verbose: bool = verbose
+
+    def generate(self, name: str, force: bool = False) -> str:
+        """Build the table of a material set after the ones it leads into, unless it exists already.
+
+        Returns
+        -------
+        str
+            The canonical name the table was written under.
+        """
+        name, _ = canonical_name(name)
+        tablebases = self.tablebases
+        if tablebases.path(name).exists() and not force:
+            return name
+        layout = tablebases.layout(name)
+        for child in self._successors(layout.kinds):
+            self.generate(child)
+        start = time.perf_counter()
+        values = self._solve(layout)
+        tablebases.directory.mkdir(parents=True, exist_ok=True)
+        np.save(tablebases.path(name), values)
+        tablebases.tables.pop(name, None)
+        if self.verbose:
+            valid = values != np.iinfo(values.dtype).min
+            print(
+                f"{name}: {valid.sum()} positions, {(values[valid] > 0).sum()} wins, {(values[valid] == 0).sum()} draws, "
+                f"{(values[valid] < 0).sum()} losses, longest mate {mate_plies(values[valid]).max()} plies, "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+        return name
+
+    @staticmethod
+    def _successors(kinds: Tuple[int, ...]) -> List[str]:
+        """Material sets a capture or a promotion leads into, without the bare kings."""
+        names = set()
+        for slot, kind in enumerate(kinds):
+            if kind & Piece.TYPE_MASK == Piece.KING:
+                continue
+            rest = kinds[:slot] + kinds[slot + 1:]
+            names.add(material_name(rest))
+            if kind & Piece.TYPE_MASK == Piece.PAWN:
+                promoted = [kinds[:slot] + ((kind & Piece.COLOR_MASK) | ptype,) + kinds[slot + 1:] for ptype in PROMOTION_TYPES]
+                # A pawn can promote by taking any other non king piece.
+                for other in promoted:
+                    names.add(material_name(other))
+                    names.update(
+                        material_name(other[:taken] + other[taken + 1:])
+                        for taken, piece in enumerate(other)
+                        if taken != slot and piece & Piece.TYPE_MASK != Piece.KING
+                    )
+        return sorted(name for name in names if len(name) > 2)
+
+    def _solve(self, layout: TableLayout) -> np.ndarray:
+        """Values of every index of a table."""
+        size = layout.size
+        half = size // 2
+        valid = np.zeros(size, dtype=bool)
+        in_check = np.zeros(size, dtype=bool)
+        moves = np.zeros(size, dtype=np.int64)
+        parents: List[np.ndarray] = []
+        children: List[np.ndarray] = []
+        exit_parents: List[np.ndarray] = []
+        exit_values: List[np.ndarray] = []
+
+        for stm in (0, 1):
+            for start in range(stm * half, (stm + 1) * half, CHUNK_SIZE):
+                index = np.arange(start, min(start + CHUNK_SIZE, (stm + 1) * half), dtype=np.int64)
+                _, squares = layout.decode(index)
+                ok, checked = self._legal_positions(layout.kinds, stm, squares)
+                index = index[ok]
+                squares = [sq[ok] for sq in squares]
+                valid[index] = True
+                in_check[index] = checked[ok]
+                for rows, child, value in self._moves(layout, stm, squares):
+                    if child is not None:
+                        parents.append(index[rows].astype(np.int32))
+                        children.append(child.astype(np.int32))
+                    else:
+                        exit_parents.append(index[rows].astype(np.int32))
+                        exit_values.append(value)
+                    moves[index[rows]] += 1
+
+        parent = np.concatenate(parents) if parents else np.zeros(0, dtype=np.int32)
+        child = np.concatenate(children) if children else np.zeros(0, dtype=np.int32)
+        exit_parent = np.concatenate(exit_parents) if exit_parents else np.zeros(0, dtype=np.int32)
+        exit_value = np.concatenate(exit_values) if exit_values else np.zeros(0, dtype=np.int16)
+        del parents, children, exit_parents, exit_values
+
+        values = np.zeros(size, dtype=np.int16)
+        values[valid & in_check & (moves == 0)] = -1
+        unresolved = valid & (moves > 0)
+        # Plies of the longest mate behind a capture or a promotion, the passes go on at least that far.
+        exit_plies = int(mate_plies(exit_value).max()) if len(exit_value) else 0
+        plies = 1
+        while True:
+            child_values = values[child]
+            # A move into a position lost in plies - 1 wins in plies.
+            win = np.bincount(parent[child_values == -plies], minlength=size) > 0
+            win |= np.bincount(exit_parent[exit_value == -plies], minlength=size) > 0
+            # Every move leads into a win for the other side, at the latest in plies - 1.
+            wins = np.bincount(parent[child_values > 0], minlength=size)
+            wins += np.bincount(exit_parent[(exit_value > 0) & (exit_value < plies)], minlength=size)
+            new_win = unresolved & win
+            new_loss = unresolved & ~win & (wins == moves)
+            values[new_win] = plies
+            values[new_loss] = -plies - 1
+            unresolved &= ~(new_win | new_loss)
+            if not new_win.any() and not new_loss.any() and plies > exit_plies:
+                break
+            plies += 1
+
+        dtype = np.int8 if plies < np.iinfo(np.int8).max else np.int16
+        values = values.astype(dtype)
+        values[~valid] = np.iinfo(dtype).min
+        return values
+
+    @staticmethod
+    def _legal_positions(kinds: Tuple[int, ...], stm: int, squares: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Which positions can happen with the side to move, and which of them have it in check."""
+        ok = np.ones(len(squares[0]), dtype=bool)
+        for slot, sq in enumerate(squares):
+            for other in squares[:slot]:
+                ok &= sq != other
+            if kinds[slot] & Piece.TYPE_MASK == Piece.PAWN:
+                ok &= (sq >= 8) & (sq < 56)
+        occupied = np.bitwise_or.reduce([_SQUARE_BITS[sq] for sq in squares])
+        mover = (Piece.WHITE, Piece.BLACK)[stm]
+        king_slots = {kind & Piece.COLOR_MASK: slot for slot, kind in enumerate(kinds) if kind & Piece.TYPE_MASK == Piece.KING}
+        checks = {}
+        for color, king_slot in king_slots.items():
+            attacked = np.zeros(len(ok), dtype=bool)
+            for slot, kind in enumerate(kinds):
+                if not kind & color:
+                    attacked |= _attacks(kind, squares[slot], squares[king_slot], occupied)
+            checks[color] = attacked
+        ok &= ~checks[Piece.get_enemy_color(mover)]
+        return ok, checks[mover]
+
+    def _moves(self, layout: TableLayout, stm: int, squares: List[np.ndarray]):
+        """The legal moves of some positions with the same side to move.
+
+        Yields
+        ------
+        Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]
+            The rows of the positions a move is legal in and either the index of
+            the position it leads to in the same table or its value from a
+            smaller one.
+        """
+        kinds = layout.kinds
+        color = (Piece.WHITE, Piece.BLACK)[stm]
+        occupied = np.bitwise_or.reduce([_SQUARE_BITS[sq] for sq in squares])
+        own = [slot for slot, kind in enumerate(kinds) if kind & color]
+        enemy = [slot for slot, kind in enumerate(kinds) if not kind & color]
+        capturable = [slot for slot in enemy if kinds[slot] & Piece.TYPE_MASK != Piece.KING]
+
+        for slot in own:
+            ptype = kinds[slot] & Piece.TYPE_MASK
+            frm = squares[slot]
+            if ptype == Piece.PAWN:
+                step = PAWN_STEP[color]
+                single = frm + step
+                free = _SQUARE_BITS[single] & occupied == 0
+                targets = [(single, free, None)]
+                double = np.clip(frm + 2 * step, 0, 63)
+                targets.append((double, free & (frm >> 3 == PAWN_START_ROW[color]) & (_SQUARE_BITS[double] & occupied == 0), None))
+                pawn_attacks = _PAWN_ATTACKS[color][frm]
+                for taken in capturable:
+                    targets.append((squares[taken], (pawn_attacks >> squares[taken].astype(np.uint64)) & _U64_ONE != 0, taken))
+            else:
+                table = _TARGETS[ptype]
+                targets = []
+                for column in range(table.shape[1]):
+                    raw = table[frm, column]
+                    to = np.maximum(raw, 0)
+                    possible = raw >= 0
+                    if ptype in SLIDERS:
+                        possible &= _BETWEEN[frm, to] & occupied == 0
+                    for other in own:
+                        possible &= to != squares[other]
+                    for other in enemy:
+                        if other not in capturable:
+                            possible &= to != squares[other]
+                    quiet = possible.copy()
+                    for taken in capturable:
+                        hit = to == squares[taken]
+                        quiet &= ~hit
+                        targets.append((to, possible & hit, taken))
+                    targets.append((to, quiet, None))
+
+            for to, possible, taken in targets:
+                rows = np.flatnonzero(possible)
+                if not len(rows):
+                    continue
+                yield from self._play(layout, stm, squares, occupied, rows, slot, to[rows], taken)
+
+    def _play(self, layout: TableLayout, stm: int, squares: List[np.ndarray], occupied: np.ndarray, rows: np.ndarray, slot: int, to: np.ndarray, taken: Optional[int]):
+        """Play one move per row and yield the legal ones the way _moves does."""
+        kinds = layout.kinds
+        color = kinds[slot] & Piece.COLOR_MASK
+        after = [sq[rows] for sq in squares]
+        after[slot] = to
+        occupied_after = (occupied[rows] & ~_SQUARE_BITS[squares[slot][rows]]) | _SQUARE_BITS[to]
+        king_sq = after[next(s for s, kind in enumerate(kinds) if kind == color | Piece.KING)]
+        attacked = np.zeros(len(rows), dtype=bool)
+        for other, kind in enumerate(kinds):
+            if other != taken and not kind & color:
+                attacked |= _attacks(kind, after[other], king_sq, occupied_after)
+        legal = ~attacked
+        rows = rows[legal]
+        if not len(rows):
+            return
+        after = [sq[legal] for sq in after]
+        child_stm = np.full(len(rows), stm ^ 1, dtype=np.int64)
+
+        last = after[slot] >> 3 == PROMOTION_ROW[color]
+        promotes = kinds[slot] & Piece.TYPE_MASK == Piece.PAWN and last.any()
+        if taken is None and not promotes:
+            yield rows, layout.encode(child_stm, after), None
+            return
+        if promotes:
+            # The pawns that got to the last row promote, the others stay pawns.
+            variants = [(color | ptype, last) for ptype in PROMOTION_TYPES]
+            if not last.all():
+                variants.append((kinds[slot], ~last))
+        else:
+            variants = [(kinds[slot], np.ones(len(rows), dtype=bool))]
+        for kind, selected in variants:
+            child_kinds = list(kinds)
+            child_kinds[slot] = kind
+            child_squares = [sq[selected] for sq in after]
+            if taken is not None:
+                del child_kinds[taken]
+                del child_squares[taken]
+            if tuple(child_kinds) == kinds:
+                yield rows[selected], layout.encode(child_stm[selected], child_squares), None
+                continue
+            values = self.tablebases.lookup(child_kinds, child_stm[selected], child_squares)
+            if values is None:
+                raise FileNotFoundError(f"The {canonical_name(material_name(child_kinds))[0]} table is missing.")
+            yield rows[selected], None, values
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases by retrograde analysis.")
+    parser.add_argument("materials", nargs="+", help=f"material sets like KQK or KRKN, up to {MAX_PIECES} pieces")
+    parser.add_argument("--dir", type=Path, default=Path("tablebases"), help="where the tables are written")
+    parser.add_argument("--force", action="store_true", help="generate the tables again even when they exist")
+    args = parser.parse_args(argv)
+
+    generator = TablebaseGenerator(args.dir)
+    for name in args.materials:
+        try:
+            generator.generate(name.upper(), args.force)
+        except ValueError as error:
+            print(error)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
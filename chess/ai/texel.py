@@ -0,0 +1,307 @@
+"""Texel tuning of the material and piece-square tables.
+
+The evaluation is tuned so that sigmoid(K * eval / 400) predicts the game
+results of a dataset of positions as well as possible (mean squared error),
+the method from the Texel engine.  Run it with
+
+    python -m chess.ai.texel positions.epd --epochs 500 --out tuned.npz
+
+The dataset holds one position per line, a FEN or EPD followed by the
+result of the game from white's point of view, as ``1-0``, ``0-1``,
+``1/2-1/2`` or a number like ``[0.5]``.
+
+The tapered material plus piece-square evaluation is linear in the table
+entries, so every position is turned once into a sparse row of feature
+counts (+1 for a white piece on a square, -1 for a black one on the mirrored
+square) and its phase.  The rows are kept in CSR form in a compressed .npz
+next to the dataset and reused until the dataset changes; every epoch is
+then a handful of NumPy operations over all positions at once, nothing is
+recomputed from the positions.
+"""
+import argparse
+import hashlib
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from chess.board import Fen
+from chess.board.pst import EG_TABLES, EG_VALUES, MAX_PHASE, MG_TABLES, MG_VALUES, PHASE_WEIGHTS
+from chess.pieces.piece import Piece
+
+PIECE_TYPES = (Piece.KING, Piece.PAWN, Piece.KNIGHT, Piece.BISHOP, Piece.ROOK, Piece.QUEEN)
+# One feature per piece type and square, the middlegame weights come first, then the endgame ones.
+FEATURES = len(PIECE_TYPES) * 64
+RESULT = re.compile(r'(1-0|0-1|1/2-1/2|\[\s*[01](?:\.[05]0*)?\s*\])\s*"?\s*;?\s*$')
+RESULT_VALUES = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+CACHE_VERSION = 1
+
+
+class FeatureSet(NamedTuple):
+    """The sparse feature rows of a dataset, row i is entries indptr[i] to indptr[i + 1] of indices and coefs."""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    coefs: np.ndarray
+    phase: np.ndarray
+    results: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+
+def feature_index(ptype: int, sq: int) -> int:
+    """Feature of a piece type on a square seen from white, a8 is square 0 like in the tables."""
+    return PIECE_TYPES.index(ptype) * 64 + sq
+
+
+def parse_dataset(path: Path) -> Iterator[Tuple[str, float]]:
+    """Yield the (piece placement, result) of every line of the dataset, lines without a result are skipped."""
+    with open(path) as lines:
+        for line in lines:
+            line = line.strip()
+            match = RESULT.search(line)
+            if not line or not match:
+                continue
+            token = match.group(1).strip("[] ")
+            result = RESULT_VALUES[token] if token in RESULT_VALUES else float(token)
+            yield line.split()[0], result
+
+
+def position_features(placement: str) -> Tuple[List[int], List[int], int]:
+    """Feature indices, their counts and the phase of the piece placement field of a FEN."""
+    counts = {}
+    phase = 0
+    for piece, (row, col) in Fen.make_state_and_pieces(placement):
+        ptype = piece & Piece.TYPE_MASK
+        sq = row * 8 + col
+        if piece & Piece.WHITE:
+            index, sign = feature_index(ptype, sq), 1
+        else:
+            index, sign = feature_index(ptype, sq ^ 56), -1
+        counts[index] = counts.get(index, 0) + sign
+        phase += PHASE_WEIGHTS[ptype]
+    indices = [index for index, count in counts.items() if count]
+    return indices, [counts[index] for index in indices], min(phase, MAX_PHASE)
+
+
+def build_features(path: Path, cache_dir: Optional[Path] = None) -> FeatureSet:
+    """Turn the dataset into a FeatureSet, or load it from the cache when the dataset has not changed since.
+
+    Parameters
+    ----------
+    path : Path
+        The dataset.
+    cache_dir : Path, optional
+        Where the cache goes, next to the dataset by default.
+
+    Returns
+    -------
+    FeatureSet
+        One sparse row per position with a result.
+    """
+    path = Path(path)
+    cache = (cache_dir or path.parent) / f"{path.name}.{_dataset_digest(path)}.features.npz"
+    if cache.exists():
+        with np.load(cache) as data:
+            return FeatureSet(data["indptr"], data["indices"], data["coefs"], data["phase"], data["results"])
+
+    indptr = [0]
+    indices: List[int] = []
+    coefs: List[int] = []
+    phase = []
+    results = []
+    for placement, result in parse_dataset(path):
+        row_indices, row_coefs, row_phase = position_features(placement)
+        indices.extend(row_indices)
+        coefs.extend(row_coefs)
+        indptr.append(len(indices))
+        phase.append(row_phase)
+        results.append(result)
+    features = FeatureSet(
+        np.array(indptr, dtype=np.int64),
+        np.array(indices, dtype=np.int16),
+        np.array(coefs, dtype=np.int8),
+        np.array(phase, dtype=np.uint8),
+        np.array(results, dtype=np.float32),
+    )
+    np.savez_compressed(cache, **features._asdict())
+    return features
+
+
+def _dataset_digest(path: Path) -> str:
+    """Changes when the dataset is rewritten or the feature layout changes, so a stale cache is not picked up."""
+    stat = path.stat()
+    return hashlib.sha1(f"{CACHE_VERSION}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+
+
+def initial_weights() -> np.ndarray:
+    """The current material plus piece-square values as a (2, FEATURES) array, middlegame then endgame."""
+    weights = np.zeros((2, FEATURES))
+    for phase, (values, tables) in enumerate(((MG_VALUES, MG_TABLES), (EG_VALUES, EG_TABLES))):
+        for ptype in PIECE_TYPES:
+            start = feature_index(ptype, 0)
+            weights[phase, start:start + 64] = values[ptype] + np.array(tables[ptype])
+    return weights
+
+
+class TexelTuner:
+    """Full batch gradient descent with Adam over a FeatureSet."""
+
+    def __init__(self, features: FeatureSet):
+        self.features: FeatureSet = features
+        # Position of every non zero entry, for the scatter and gather of the gradient.
+        self.rows: np.ndarray = np.repeat(np.arange(len(features)), np.diff(features.indptr))
+        self.indices: np.ndarray = features.indices.astype(np.int64)
+        self.coefs: np.ndarray = features.coefs.astype(np.float64)
+        self.mg_share: np.ndarray = features.phase / MAX_PHASE
+        self.results: np.ndarray = features.results.astype(np.float64)
+
+    def evaluate(self, weights: np.ndarray) -> np.ndarray:
+        """Tapered score of every position from white's point of view."""
+        count = len(self.results)
+        mg = np.bincount(self.rows, weights=self.coefs * weights[0, self.indices], minlength=count)
+        eg = np.bincount(self.rows, weights=self.coefs * weights[1, self.indices], minlength=count)
+        return mg * self.mg_share + eg * (1 - self.mg_share)
+
+    def loss(self, weights: np.ndarray, scale: float) -> float:
+        predicted = _sigmoid(scale * self.evaluate(weights) / 400)
+        return float(np.mean((self.results - predicted) ** 2))
+
+    def fit_scale(self, weights: np.ndarray, low: float = 0.1, high: float = 5.0, steps: int = 40) -> float:
+        """The K of the sigmoid that fits the current weights best, found by a golden section search."""
+        scores = self.evaluate(weights)
+        ratio = (5 ** 0.5 - 1) / 2
+
+        def loss(scale: float) -> float:
+            return float(np.mean((self.results - _sigmoid(scale * scores / 400)) ** 2))
+
+        for _ in range(steps):
+            left = high - ratio * (high - low)
+            right = low + ratio * (high - low)
+            if loss(left) < loss(right):
+                high = right
+            else:
+                low = left
+        return (low + high) / 2
+
+    def gradient(self, weights: np.ndarray, scale: float) -> np.ndarray:
+        """Gradient of the loss with respect to every weight."""
+        predicted = _sigmoid(scale * self.evaluate(weights) / 400)
+        # d loss / d score of every position.
+        d_score = -2 * (self.results - predicted) * predicted * (1 - predicted) * scale / 400 / len(self.results)
+        per_entry = self.coefs * d_score[self.rows]
+        return np.stack((
+            np.bincount(self.indices, weights=per_entry * self.mg_share[self.rows], minlength=FEATURES),
+            np.bincount(self.indices, weights=per_entry * (1 - self.mg_share[self.rows]), minlength=FEATURES),
+        ))
+
+    def tune(
+        self,
+        weights: np.ndarray,
+        scale: float,
+        epochs: int = 500,
+        learning_rate: float = 1.0,
+        verbose: bool = True,
+    ) -> np.ndarray:
+        """Run Adam for a number of epochs and return the tuned weights, the given ones are left alone."""
+        weights = weights.copy()
+        moment = np.zeros_like(weights)
+        velocity = np.zeros_like(weights)
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+        for epoch in range(1, epochs + 1):
+            gradient = self.gradient(weights, scale)
+            moment = beta1 * moment + (1 - beta1) * gradient
+            velocity = beta2 * velocity + (1 - beta2) * gradient ** 2
+            weights -= learning_rate * (moment / (1 - beta1 ** epoch)) / (np.sqrt(velocity / (1 - beta2 ** epoch)) + epsilon)
+            if verbose and (epoch % 50 == 0 or epoch == epochs):
+                print(f"  epoch {epoch:5}: loss {self.loss(weights, scale):.6f}")
+        return weights
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def split_tables(weights: np.ndarray) -> Tuple[dict, dict, dict, dict]:
+    """Split the tuned weights back into piece values and square tables like the ones in chess.board.pst.
+
+    The value of a piece is the mean of its weights over the squares it can stand on, the table what is left.
+    """
+    rounded = np.rint(weights).astype(int)
+    split = []
+    for phase in range(2):
+        values = {}
+        tables = {}
+        for ptype in PIECE_TYPES:
+            start = feature_index(ptype, 0)
+            table = rounded[phase, start:start + 64]
+            if ptype == Piece.KING:
+                value = 0
+            elif ptype == Piece.PAWN:
+                value = int(round(table[8:56].mean()))
+            else:
+                value = int(round(table.mean()))
+            values[ptype] = value
+            tables[ptype] = [int(weight) - value for weight in table]
+            if ptype == Piece.PAWN:
+                # Pawns never stand on the first or last row.
+                tables[ptype][:8] = tables[ptype][56:] = [0] * 8
+        split.extend((values, tables))
+    return tuple(split)
+
+
+def export_tables(weights: np.ndarray, path: Path) -> None:
+    """Write the tuned values and tables to a .npz, and print them in the layout of chess.board.pst."""
+    mg_values, mg_tables, eg_values, eg_tables = split_tables(weights)
+    np.savez(
+        path,
+        mg_values=np.array([mg_values[ptype] for ptype in PIECE_TYPES]),
+        eg_values=np.array([eg_values[ptype] for ptype in PIECE_TYPES]),
+        mg_tables=np.array([mg_tables[ptype] for ptype in PIECE_TYPES]),
+        eg_tables=np.array([eg_tables[ptype] for ptype in PIECE_TYPES]),
+    )
+    names = {Piece.KING: "KING", Piece.PAWN: "PAWN", Piece.KNIGHT: "KNIGHT", Piece.BISHOP: "BISHOP", Piece.ROOK: "ROOK", Piece.QUEEN: "QUEEN"}
+    for label, values, tables in (("MG", mg_values, mg_tables), ("EG", eg_values, eg_tables)):
+        print(f"{label}_VALUES = {{{', '.join(f'Piece.{names[ptype]}: {values[ptype]}' for ptype in PIECE_TYPES)}}}")
+        print(f"{label}_TABLES = {{")
+        for ptype in PIECE_TYPES:
+            print(f"    Piece.{names[ptype]}: [")
+            for row in range(8):
+                print("        " + ", ".join(str(weight) for weight in tables[ptype][row * 8:row * 8 + 8]) + ",")
+            print("    ],")
+        print("}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Texel tune the material and piece-square tables.")
+    parser.add_argument("dataset", type=Path, help="EPD/FEN file with one position and game result per line")
+    parser.add_argument("--cache-dir", type=Path, help="where the feature cache goes, next to the dataset by default")
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--lr", type=float, default=1.0, help="Adam step size, in centipawns")
+    parser.add_argument("--scale", type=float, help="sigmoid scale K, fitted to the current tables when left out")
+    parser.add_argument("--out", type=Path, default=Path("tuned_tables.npz"), help="where the tuned tables are written")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    features = build_features(args.dataset, args.cache_dir)
+    print(f"{len(features)} positions, {len(features.indices)} non zero features in {time.perf_counter() - start:.2f}s")
+    if not len(features):
+        return 1
+    tuner = TexelTuner(features)
+    weights = initial_weights()
+    scale = args.scale if args.scale is not None else tuner.fit_scale(weights)
+    print(f"K = {scale:.4f}, loss {tuner.loss(weights, scale):.6f}")
+    start = time.perf_counter()
+    weights = tuner.tune(weights, scale, args.epochs, args.lr)
+    print(f"Tuned in {time.perf_counter() - start:.2f}s")
+    export_tables(weights, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Time management for playing on a clock.
+
+From the time left on the clock, the increment and the moves to go until
+the next time control two limits are worked out for a move:
+
+    * the soft limit, the time the move should take: iterative deepening
+      does not start a new depth once it is used up, a deeper iteration
+      would most likely not finish anyway,
+    * the hard limit, the time the move may never exceed: the search is
+      aborted in the middle of an iteration and the move of the last
+      finished depth is played.
+
+Both keep a safety overhead off the clock for the time lost outside the
+search, so a move is never flagged however loaded the machine is.
+"""
+from typing import NamedTuple, Optional
+
+# Moves a game is assumed to still last when the clock has no moves to go.
+MOVES_TO_GO_GUESS = 30
+# Share of the increment spent on top of the slice of the clock.
+INCREMENT_SHARE = 0.75
+# How far past the soft limit the search may run, and the most of the clock a single move may take.
+HARD_FACTOR = 4.0
+MAX_CLOCK_SHARE = 0.5
+# Seconds.
+MOVE_OVERHEAD = 0.05
+MIN_TIME = 0.01
+
+
+class TimeControl(NamedTuple):
+    """State of the clock of the side to move, in seconds."""
+
+    remaining: float
+    increment: float = 0.0
+    # Moves until the next time control, None for sudden death.
+    moves_to_go: Optional[int] = None
+
+
+class TimeBudget(NamedTuple):
+    """Seconds a move should and may take."""
+
+    soft: float
+    hard: float
+
+
+class TimeManager:
+    """Splits the clock into per move budgets."""
+
+    def __init__(self, overhead: float = MOVE_OVERHEAD):
+        """Set a time manager up.
+
+        Parameters
+        ----------
+        overhead : float
+            Seconds kept off the clock every move for the time lost outside the search.
+        """
+        self.overhead: float = overhead
+
+    def budget(self, control: TimeControl) -> TimeBudget:
+        """Soft and hard limit for the next move.
+
+        Parameters
+        ----------
+        control : TimeControl
+            The clock of the side to move.
+
+        Returns
+        -------
+        TimeBudget
+            The soft limit is never above the hard one, the hard one never above what is left on the clock.
+        """
+        moves_to_go = control.moves_to_go if control.moves_to_go else MOVES_TO_GO_GUESS
+        usable = max(control.remaining - self.overhead, MIN_TIME)
+        soft = usable / moves_to_go + control.increment * INCREMENT_SHARE
+        if moves_to_go == 1:
+            # The last move before the time control may use everything.
+            hard = usable
+        else:
+            hard = min(soft * HARD_FACTOR, usable * MAX_CLOCK_SHARE)
+        return TimeBudget(min(soft, hard), hard)
@@ -0,0 +1,229 @@
+"""Fixed-size transposition table for the search.
+
+Entries live in two preallocated ``array('Q')`` buffers, one for the
+position keys and one for the packed entry data, so the memory used is
+decided once by the size in MB and never grows.
+
+Each bucket has two slots: the first is depth-preferred, it is only
+replaced by a deeper search or when it is left over from an older search,
+the second one always takes whatever did not fit in the first.
+
+The key word of a slot holds the position key XORed with the data word, an
+entry is only trusted when XORing them back gives the probed key.  A slot
+written half by one process and half by another, as can happen to the
+SharedTranspositionTable the processes of a parallel search write to
+without any lock, then just reads as a miss.
+
+Layout of the data word:
+    bit 0-15: best move (packed 16 bit move, 0 for none)
+    bit 16-31: score + 32768
+    bit 32-39: depth
+    bit 40-41: bound type
+    bit 42-47: age of the search that stored it
+"""
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Tuple
+
+ENTRY_BYTES = 16
+BUCKET_SLOTS = 2
+
+SCORE_OFFSET = 0x8000
+MOVE_MASK = 0xFFFF
+SCORE_SHIFT = 16
+DEPTH_SHIFT = 32
+BOUND_SHIFT = 40
+AGE_SHIFT = 42
+AGE_MASK = 0x3F
+
+
+class Bound:
+    """What the stored score tells about the real score of the position."""
+
+    NONE = 0
+    EXACT = 1
+    # The search failed high, the real score is at least the stored one.
+    LOWER = 2
+    # The search failed low, the real score is at most the stored one.
+    UPPER = 3
+
+
+class TranspositionTable:
+    """A bounded hash table keyed by the board Zobrist key."""
+
+    def __init__(self, size_mb: float = 16):
+        """Allocate the table.
+
+        Parameters
+        ----------
+        size_mb : float
+            Memory to use, rounded down so the bucket count is a power of two.
+        """
+        buckets = max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SLOTS))
+        # Round down to a power of two so the index is a simple mask.
+        self.buckets: int = 1 << (buckets.bit_length() - 1)
+        self.mask: int = self.buckets - 1
+        self.keys: array
+        self.data: array
+        self._allocate(self.buckets * BUCKET_SLOTS)
+        self.age: int = 0
+
+        self.probes: int = 0
+        self.hits: int = 0
+        self.stores: int = 0
+        self.overwrites: int = 0
+
+    @property
+    def size_mb(self) -> float:
+        """Memory used by the entries."""
+        return self.buckets * BUCKET_SLOTS * ENTRY_BYTES / (1024 * 1024)
+
+    def new_search(self) -> None:
+        """Age the table so entries of the previous searches become the first to go."""
+        self.age = (self.age + 1) & AGE_MASK
+
+    def _allocate(self, slots: int) -> None:
+        """Give the table empty key and data buffers of the given number of slots."""
+        self.keys = array("Q", bytes(8 * slots))
+        self.data = array("Q", bytes(8 * slots))
+
+    def clear(self) -> None:
+        """Empty the table and reset the statistics."""
+        self._allocate(self.buckets * BUCKET_SLOTS)
+        self.age = 0
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """Look a position up.
+
+        Returns
+        -------
+        Optional[Tuple[int, int, int, int]]
+            (depth, score, bound, move) of the stored entry or None on a miss.
+        """
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data[slot]
+        if keys[slot] ^ data != key:
+            slot += 1
+            data = self.data[slot]
+            if keys[slot] ^ data != key:
+                return None
+        if not data:
+            return None
+        self.hits += 1
+        return (
+            (data >> DEPTH_SHIFT) & 0xFF,
+            ((data >> SCORE_SHIFT) & 0xFFFF) - SCORE_OFFSET,
+            (data >> BOUND_SHIFT) & 0x3,
+            data & MOVE_MASK,
+        )
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: int = 0) -> None:
+        """Store the result of a search, picking the slot by the replacement policy."""
+        self.stores += 1
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+        old = data[slot]
+        if keys[slot + 1] ^ data[slot + 1] == key:
+            # Already in the always-replace slot, keep updating it there.
+            slot += 1
+        elif (
+            keys[slot] ^ old != key
+            and old
+            and ((old >> AGE_SHIFT) & AGE_MASK) == self.age
+            and ((old >> DEPTH_SHIFT) & 0xFF) > depth
+        ):
+            # The depth-preferred slot holds a deeper result of this search.
+            slot += 1
+
+        old = data[slot]
+        if keys[slot] ^ old != key:
+            if old:
+                self.overwrites += 1
+        elif not move:
+            # Do not lose the best move of an earlier search of the same position.
+            move = old & MOVE_MASK
+
+        new = (
+            move
+            | (score + SCORE_OFFSET) << SCORE_SHIFT
+            | min(depth, 0xFF) << DEPTH_SHIFT
+            | bound << BOUND_SHIFT
+            | self.age << AGE_SHIFT
+        )
+        data[slot] = new
+        keys[slot] = key ^ new
+
+    def hashfull(self) -> int:
+        """Permille of the first thousand slots used by the current search."""
+        sample = min(1000, len(self.data))
+        used = sum(1 for data in self.data[:sample] if data and ((data >> AGE_SHIFT) & AGE_MASK) == self.age)
+        return used * 1000 // sample
+
+    def stats(self) -> Dict[str, float]:
+        """Counters collected since the table was created or cleared."""
+        return {
+            "size_mb": self.size_mb,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "hashfull": self.hashfull(),
+        }
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A transposition table in shared memory, every process that attaches to it by name reads and writes the same entries.
+
+    The process that creates the table owns it and has to unlink it once the
+    other processes are done with it, every process closes its own view.
+    """
+
+    def __init__(self, size_mb: float = 16, name: Optional[str] = None):
+        """Create a table or attach to an existing one.
+
+        Parameters
+        ----------
+        size_mb : float
+            Memory to use, it has to be the same in every process attached to the table.
+        name : str, optional
+            Name of the shared memory block of an existing table, a new block is created when left out.
+        """
+        self.name: Optional[str] = name
+        self.shm: Optional[SharedMemory] = None
+        self.words: Optional[memoryview] = None
+        super().__init__(size_mb)
+
+    def _allocate(self, slots: int) -> None:
+        if self.shm is None:
+            if self.name is None:
+                self.shm = SharedMemory(create=True, size=16 * slots)
+                self.name = self.shm.name
+            else:
+                self.shm = SharedMemory(name=self.name)
+            # Keys first, then the data, both 8 byte words.
+            self.words = self.shm.buf.cast("Q")
+            self.keys = self.words[:slots]
+            self.data = self.words[slots:2 * slots]
+        else:
+            # Cleared, zero the block in place so the other processes see it empty too.
+            self.shm.buf[:16 * slots] = bytes(16 * slots)
+
+    def close(self) -> None:
+        """Drop the view of this process, the table lives on for the other ones."""
+        if self.shm is not None:
+            self.keys.release()
+            self.data.release()
+            self.words.release()
+            self.shm.close()
+            self.shm = None
+
+    def unlink(self) -> None:
+        """Close the table and free the shared memory, only the process that created it should do that."""
+        if self.shm is not None:
+            self.shm.unlink()
+            self.close()
@@ -2,6 +2,8 @@
 from .board import Board
 from .board_utils import BoardUtils
 from .fen import Fen
+from .pst import Pst
+from .zobrist import Zobrist
 
 
-__all__ = ["Board", "Fen", "BoardUtils"]
+__all__ = ["Board", "Fen", "BoardUtils", "Pst", "Zobrist"]
@@ -0,0 +1,115 @@
+"""Bitboard helpers for the board representation.
+
+Every piece kind (colour | type) is kept as a 64-bit Python int where
+bit ``i`` is set when that kind occupies square ``i``.  Squares follow the
+same numbering as ``BoardUtils.get_index_from_coords`` so index 0 is the
+top-left tile (a8) and index 63 the bottom-right tile (h1).
+"""
+from typing import Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+
+from chess.pieces.piece import Piece
+
+FULL_BB = 0xFFFF_FFFF_FFFF_FFFF
+SQUARE_BB: List[int] = [1 << sq for sq in range(64)]
+
+PIECE_TYPES = (Piece.KING, Piece.PAWN, Piece.KNIGHT, Piece.BISHOP, Piece.ROOK, Piece.QUEEN)
+PIECE_KINDS = tuple(color | ptype for color in (Piece.WHITE, Piece.BLACK) for ptype in PIECE_TYPES)
+
+
+class Bitboards:
+    """A collection of static methods for bitboard related operations."""
+
+    @staticmethod
+    def empty() -> Dict[int, int]:
+        """Return one empty bitboard for each of the twelve piece kinds."""
+        return {kind: 0 for kind in PIECE_KINDS}
+
+    @staticmethod
+    def from_pieces(pcs_and_coords: List[Tuple[int, Tuple[int, int]]]) -> Dict[int, int]:
+        """Build the piece bitboards from the (piece, coords) list the Fen parser produces."""
+        bitboards = Bitboards.empty()
+        for pc, (row, col) in pcs_and_coords:
+            bitboards[Bitboards.get_kind(pc)] |= SQUARE_BB[row * 8 + col]
+        return bitboards
+
+    @staticmethod
+    def get_occupancy(bitboards: Dict[int, int]) -> Dict[int, int]:
+        """Return the squares occupied by each colour."""
+        occupancy = {Piece.WHITE: 0, Piece.BLACK: 0}
+        for kind, bb in bitboards.items():
+            occupancy[kind & Piece.COLOR_MASK] |= bb
+        return occupancy
+
+    @staticmethod
+    def get_kind(piece: int) -> int:
+        """Strip the specific piece bits so only colour and type remain."""
+        return piece & (Piece.COLOR_MASK | Piece.TYPE_MASK)
+
+    @staticmethod
+    def lsb(bb: int) -> int:
+        """Return the index of the least significant set bit."""
+        return (bb & -bb).bit_length() - 1
+
+    @staticmethod
+    def msb(bb: int) -> int:
+        """Return the index of the most significant set bit."""
+        return bb.bit_length() - 1
+
+    @staticmethod
+    def popcount(bb: int) -> int:
+        """Count the set bits."""
+        return bb.bit_count()
+
+    @staticmethod
+    def iter_squares(bb: int) -> Iterator[int]:
+        """Yield the index of every set bit, lowest first."""
+        while bb:
+            lsb = bb & -bb
+            yield lsb.bit_length() - 1
+            bb ^= lsb
+
+    @staticmethod
+    def to_coords_set(bb: int) -> Set[Tuple[int, int]]:
+        """Convert a bitboard to the set of (row, col) coords used by the rest of the code."""
+        coords = set()
+        while bb:
+            lsb = bb & -bb
+            coords.add(divmod(lsb.bit_length() - 1, 8))
+            bb ^= lsb
+        return coords
+
+    @staticmethod
+    def from_coords(coords_list) -> int:
+        """Convert an iterable of (row, col) coords to a bitboard."""
+        bb = 0
+        for row, col in coords_list:
+            bb |= SQUARE_BB[row * 8 + col]
+        return bb
+
+    @staticmethod
+    def to_state(squares: List[int]) -> np.ndarray:
+        """Build the 8x8 numpy state from a flat list of 64 piece codes."""
+        return np.array(squares, dtype=np.uint32).reshape(8, 8)
+
+    @staticmethod
+    def to_squares(bitboards: Dict[int, int]) -> List[int]:
+        """Expand the bitboards into a flat list of 64 piece codes.
+
+        The specific piece bits are lost on the way, only colour and type are kept.
+        """
+        squares = [Piece.EMPTY] * 64
+        for kind, bb in bitboards.items():
+            while bb:
+                lsb = bb & -bb
+                squares[lsb.bit_length() - 1] = kind
+                bb ^= lsb
+        return squares
+
+    @staticmethod
+    def print_bb(bb: int) -> None:
+        """Print a bitboard as an 8x8 grid, mostly useful for debugging."""
+        for row in range(8):
+            print(" ".join("1" if bb & SQUARE_BB[row * 8 + col] else "." for col in range(8)))
+        print()
@@ -2,8 +2,11 @@
 import numpy as np
 from typing import Dict, List, Tuple, Literal, Union, Optional
 
+from .bitboard import Bitboards, SQUARE_BB
 from .board_utils import BoardUtils
 from .fen import Fen
+from .pst import Pst
+from .zobrist import Zobrist
 from chess.pieces.piece import Piece
 
 BOARD_OFFSET = 21
@@ -39,26 +42,58 @@ class Board:
     Meaing a tile on the board has some properties and holds
     info about the piece that either occupies it there or not.
     """
+    # The undo record of a move is a single int.
     # Castling
     # 4 bits
     WL_CASTLE = 0x1
     WR_CASTLE = 0x2
-    BL_CASTLE = 0x3
-    BR_CASTLE = 0x4
+    BL_CASTLE = 0x4
+    BR_CASTLE = 0x8
 
     CASTLE_MASK = 0xF
+    CAPTURED_MASK = 0xFFF
     EN_PASSANT_MASK = 0xFF
-    FIFITY_MOVE_MASK = 0xFF
+    SQUARE_MASK = 0x3F
+    FLAG_MASK = 0xF
 
     # Captured Piece
     # 12 bits
+    CAPTURED_SHIFT = 4
 
     # En passant
-    # It shows the square (1-64) 
+    # It shows the square (1-64), 0 when there is none
     # 8 bits
+    EN_PASSANT_SHIFT = 16
+
+    # Start and end square of the move
+    # 6 bits each
+    START_SHIFT = 24
+    END_SHIFT = 30
+
+    # What kind of move it was
+    # 4 bits
+    FLAG_SHIFT = 36
+    NORMAL_MOVE = 0x0
+    EN_PASSANT_MOVE = 0x1
+    CASTLE_MOVE = 0x2
+    PROMOTION_MOVE = 0x3
+    NULL_MOVE = 0x4
 
     # Fifty move clock
-    # 8 bits
+    # the rest of the bits
+    FIFTY_MOVE_SHIFT = 40
+
+    # The castle rights that survive a move touching the square, covers king and rook moves and rook captures.
+    CASTLE_KEEP: List[int] = [CASTLE_MASK] * 64
+    CASTLE_KEEP[0] = CASTLE_MASK ^ BL_CASTLE
+    CASTLE_KEEP[4] = CASTLE_MASK ^ (BL_CASTLE | BR_CASTLE)
+    CASTLE_KEEP[7] = CASTLE_MASK ^ BR_CASTLE
+    CASTLE_KEEP[56] = CASTLE_MASK ^ WL_CASTLE
+    CASTLE_KEEP[60] = CASTLE_MASK ^ (WL_CASTLE | WR_CASTLE)
+    CASTLE_KEEP[63] = CASTLE_MASK ^ WR_CASTLE
+
+    # King destination -> (rook start, rook end)
+    CASTLE_ROOK_MOVES: Dict[int, Tuple[int, int]] = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
 
     def __init__(self, fen: str):
         """Construct all the necessary attributes for the board object.
@@ -70,20 +105,25 @@ class Board:
         """
         self.starting_fen: str = fen
         self.last_piece_moved: Optional[Piece] = None
-        self.castle_rights: Dict[int, List[bool]]
         self.en_passant: Optional[Tuple[int, int]]
         self.color_to_move: Literal[256, 512]
         # This assign does nothing here its just for readability.
         (
             pcs_and_coords,
             self.color_to_move,
-            self.castle_rights,
+            castle_rights,
             self.en_passant,
             self.half_move_clock,
             self.full_move
         ) = Fen.translate_to_state(fen)
+        self.castling: int = Board.castle_rights_to_bits(castle_rights)
 
         self.state, self.all_pieces = Board.setup_state_and_pieces(pcs_and_coords)
+        # Flat mailbox and bitboards mirror the numpy state, they are what the move generation reads.
+        self.squares: List[int] = [int(pc) for pc in self.state.flat]
+        self.bitboards: Dict[int, int] = Bitboards.from_pieces(pcs_and_coords)
+        self.occupancy: Dict[int, int] = Bitboards.get_occupancy(self.bitboards)
+        self.occupied: int = self.occupancy[Piece.WHITE] | self.occupancy[Piece.BLACK]
 
         # Get White Lists
         # w_pieces = Board.organize_pieces(pieces, is_whites=True)
@@ -91,24 +131,176 @@ class Board:
         # b_pieces = Board.organize_pieces(pieces, is_whites=False)
 
         self.dead_pieces: List[int] = []
-        self.correct_format_print()
+        self.undo_stack: List[int] = []
+        # Position key, kept up to date by every move. The keys of the earlier positions are kept for unmake and repetitions.
+        self.key: int = Zobrist.compute(self)
+        self.key_history: List[int] = []
+        # Key of the pawns alone for the pawn hash table, unmake restores it through put/remove/move_piece.
+        self.pawn_key: int = Zobrist.compute_pawn_key(self)
+        # Tapered evaluation terms, white minus black, kept up to date by put/remove/move_piece like the key.
+        self.mg_score: int
+        self.eg_score: int
+        self.phase: int
+        self.mg_score, self.eg_score, self.phase = Pst.compute(self)
+        # An NnueAccumulator (chess.ai.nnue) once one is attached, it is told about every piece put, removed or moved.
+        self.nnue = None
+
+    @property
+    def castle_rights(self) -> Dict[int, List[bool]]:
+        """Castle rights in the [left, right] per colour format the Fen and the Game use."""
+        return {
+            Piece.WHITE: [bool(self.castling & Board.WL_CASTLE), bool(self.castling & Board.WR_CASTLE)],
+            Piece.BLACK: [bool(self.castling & Board.BL_CASTLE), bool(self.castling & Board.BR_CASTLE)],
+        }
+
+    @staticmethod
+    def castle_rights_to_bits(castle_rights: Dict[int, List[bool]]) -> int:
+        """Pack the castle rights dict into the 4 castling bits."""
+        return (
+            (Board.WL_CASTLE if castle_rights[Piece.WHITE][0] else 0)
+            | (Board.WR_CASTLE if castle_rights[Piece.WHITE][1] else 0)
+            | (Board.BL_CASTLE if castle_rights[Piece.BLACK][0] else 0)
+            | (Board.BR_CASTLE if castle_rights[Piece.BLACK][1] else 0)
+        )
 
-    def try_update_castle_rights(self, moving_piece: np.uint32) -> None:
-        """Remove castling privileges depending the moving piece."""
-        # Only for the first time the King is moving.
-        pcolor = Piece.get_color(moving_piece)
-        ptype = Piece.get_type(moving_piece)
-        if ptype == Piece.KING:
-            self.castle_rights[pcolor] = [False, False]
+    def make_move(self, start_sq: int, end_sq: int, prom_type: int = Piece.EMPTY) -> None:
+        """Play a move and push its undo record.
 
-        if Piece.get_type(moving_piece) == Piece.ROOK:
-            # Check if the rook moved was in the Right half of the board.
-            if Piece.get_the_specific_piece(moving_piece) == Piece.RIGHT_PIECE:
-                self.castle_rights[pcolor][1] = False
+        The move is expected to be at least pseudo-legal, en passant, castling and
+        double pawn pushes are recognised from the moving piece.
 
-            # Check if the rook moved was in the Left half of the board.
-            if Piece.get_the_specific_piece(moving_piece) == Piece.LEFT_PIECE:
-                self.castle_rights[pcolor][0] = False
+        Parameters
+        ----------
+        start_sq : int
+            Square index the piece moves from.
+        end_sq : int
+            Square index the piece moves to.
+        prom_type : int
+            Piece type a pawn reaching the last row turns into, defaults to a queen.
+        """
+        squares = self.squares
+        piece = squares[start_sq]
+        ptype = piece & Piece.TYPE_MASK
+        captured = squares[end_sq]
+        ep = self.en_passant
+        ep_sq = ep[0] * 8 + ep[1] if ep is not None else -1
+        if self.nnue is not None:
+            self.nnue.push()
+        # The piece keys are handled by put/remove/move_piece, the rest is done here.
+        self.key_history.append(self.key)
+        key = self.key ^ Zobrist.BLACK_TO_MOVE ^ Zobrist.CASTLE_KEYS[self.castling]
+        if ep is not None:
+            key ^= Zobrist.EN_PASSANT_KEYS[ep[1]]
+        self.key = key
+
+        flag = Board.NORMAL_MOVE
+        if captured:
+            self.remove_piece(end_sq)
+        self.move_piece(start_sq, end_sq)
+
+        self.en_passant = None
+        if ptype == Piece.PAWN:
+            if end_sq == ep_sq:
+                flag = Board.EN_PASSANT_MOVE
+                # The captured pawn sits behind the en passant square.
+                captured = self.remove_piece(end_sq + 8 if piece & Piece.WHITE else end_sq - 8)
+            elif end_sq < 8 or end_sq >= 56:
+                flag = Board.PROMOTION_MOVE
+                self.remove_piece(end_sq)
+                self.put_piece((piece ^ Piece.PAWN) | (prom_type or Piece.QUEEN), end_sq)
+            elif abs(start_sq - end_sq) == 16:
+                self.en_passant = divmod((start_sq + end_sq) // 2, 8)
+                self.key ^= Zobrist.EN_PASSANT_KEYS[start_sq & 7]
+        elif ptype == Piece.KING and abs(start_sq - end_sq) == 2:
+            flag = Board.CASTLE_MOVE
+            self.move_piece(*Board.CASTLE_ROOK_MOVES[end_sq])
+
+        self.undo_stack.append(
+            self.castling
+            | captured << Board.CAPTURED_SHIFT
+            | (ep_sq + 1) << Board.EN_PASSANT_SHIFT
+            | start_sq << Board.START_SHIFT
+            | end_sq << Board.END_SHIFT
+            | flag << Board.FLAG_SHIFT
+            | self.half_move_clock << Board.FIFTY_MOVE_SHIFT
+        )
+
+        self.castling &= Board.CASTLE_KEEP[start_sq] & Board.CASTLE_KEEP[end_sq]
+        self.key ^= Zobrist.CASTLE_KEYS[self.castling]
+        self.half_move_clock = 0 if captured or ptype == Piece.PAWN else self.half_move_clock + 1
+        if self.color_to_move == Piece.BLACK:
+            self.full_move += 1
+            self.color_to_move = Piece.WHITE
+        else:
+            self.color_to_move = Piece.BLACK
+
+    def make_null_move(self) -> None:
+        """Pass the turn to the other side, the search uses it to test if a position is good even without moving.
+
+        The half move clock starts over so repetitions are not looked for across the pass, unmake_move takes it back.
+        """
+        ep = self.en_passant
+        if self.nnue is not None:
+            self.nnue.push()
+        self.key_history.append(self.key)
+        self.key ^= Zobrist.BLACK_TO_MOVE
+        if ep is not None:
+            self.key ^= Zobrist.EN_PASSANT_KEYS[ep[1]]
+        self.undo_stack.append(
+            self.castling
+            | ((ep[0] * 8 + ep[1] + 1) if ep is not None else 0) << Board.EN_PASSANT_SHIFT
+            | Board.NULL_MOVE << Board.FLAG_SHIFT
+            | self.half_move_clock << Board.FIFTY_MOVE_SHIFT
+        )
+        self.en_passant = None
+        self.half_move_clock = 0
+        if self.color_to_move == Piece.BLACK:
+            self.full_move += 1
+            self.color_to_move = Piece.WHITE
+        else:
+            self.color_to_move = Piece.BLACK
+
+    def unmake_move(self) -> None:
+        """Take back the last move played with make_move or make_null_move and restore the board exactly."""
+        record = self.undo_stack.pop()
+        start_sq = (record >> Board.START_SHIFT) & Board.SQUARE_MASK
+        end_sq = (record >> Board.END_SHIFT) & Board.SQUARE_MASK
+        flag = (record >> Board.FLAG_SHIFT) & Board.FLAG_MASK
+        captured = (record >> Board.CAPTURED_SHIFT) & Board.CAPTURED_MASK
+        # The accumulators from before the move are on the stack, they are not updated on the way back.
+        nnue = self.nnue
+        self.nnue = None
+
+        if flag == Board.NULL_MOVE:
+            # Nothing moved, only the state below has to be restored.
+            pass
+        elif flag == Board.PROMOTION_MOVE:
+            promoted = self.remove_piece(end_sq)
+            self.put_piece((promoted & ~Piece.TYPE_MASK) | Piece.PAWN, start_sq)
+        else:
+            self.move_piece(end_sq, start_sq)
+
+        if flag == Board.CASTLE_MOVE:
+            rook_start, rook_end = Board.CASTLE_ROOK_MOVES[end_sq]
+            self.move_piece(rook_end, rook_start)
+        elif flag == Board.EN_PASSANT_MOVE:
+            self.put_piece(captured, end_sq + 8 if captured & Piece.BLACK else end_sq - 8)
+        elif captured:
+            self.put_piece(captured, end_sq)
+
+        ep_sq = ((record >> Board.EN_PASSANT_SHIFT) & Board.EN_PASSANT_MASK) - 1
+        self.en_passant = divmod(ep_sq, 8) if ep_sq >= 0 else None
+        self.castling = record & Board.CASTLE_MASK
+        self.half_move_clock = record >> Board.FIFTY_MOVE_SHIFT
+        self.key = self.key_history.pop()
+        if nnue is not None:
+            self.nnue = nnue
+            nnue.pop()
+        if self.color_to_move == Piece.WHITE:
+            self.full_move -= 1
+            self.color_to_move = Piece.BLACK
+        else:
+            self.color_to_move = Piece.WHITE
 
     @staticmethod
     def is_promoting(piece: np.uint32, end_coords: Tuple[int, int]) -> bool:
@@ -121,36 +313,94 @@ class Board:
         pcolor = Piece.get_color(piece)
         return end_coords[0] == {Piece.WHITE: 0, Piece.BLACK: 7}[pcolor]
 
-    @staticmethod
-    def promote_to(state, piece, prom_type) -> None:
+    def promote_to(self, piece: int, prom_type: int) -> None:
         """Promote to a desired Piece.
 
-        Promote to a desired Piece and update the all_pieces dictionary and state list.
+        Promote to a desired Piece and update the all_pieces dictionary, bitboards and state.
 
         Parameters
         ----------
         piece : int
-            Piece code that describes the piece type and color.
+            Piece code that describes the pawn that is promoting.
+        prom_type : int
+            The type of the piece the pawn turns into.
         """
-        # Create the Piece that the pawn will transform too
         pcolor = Piece.get_color(piece)
-        ptype = Piece.get_type(piece)
-        all_piece_coords = np.where(state == ptype)
-        piece_coords = (all_piece_coords[0][0], all_piece_coords[1][0])
+        row, col = self.all_pieces[pcolor][Piece.PAWN][piece]
+        sq = row * 8 + col
 
-        # Add it to the new piece list
         # But we keep track of which pawn it is in case we need to find it again.
         new_piece = Piece.get_the_specific_piece(piece) | prom_type | pcolor
-        state[piece_coords] = new_piece
-
-    @staticmethod
-    def simulate_state(state: np.ndarray) -> np.ndarray:
-        """Given a board state it will return a 'simulated' board state.
-
-        This will allows us to affect the board state without actually changing it.
-        """
-        # Slower but more compact
-        return np.copy(state)
+        self.remove_piece(sq)
+        self.put_piece(new_piece, sq)
+
+    def put_piece(self, piece: int, sq: int) -> None:
+        """Place a piece on an empty square and keep every representation in sync."""
+        pcolor = piece & Piece.COLOR_MASK
+        bit = SQUARE_BB[sq]
+        self.squares[sq] = piece
+        self.state.flat[sq] = piece
+        self.key ^= Zobrist.PIECE_KEYS[pcolor | (piece & Piece.TYPE_MASK)][sq]
+        if piece & Piece.TYPE_MASK == Piece.PAWN:
+            self.pawn_key ^= Zobrist.PIECE_KEYS[pcolor | Piece.PAWN][sq]
+        self.mg_score += Pst.MG[pcolor | (piece & Piece.TYPE_MASK)][sq]
+        self.eg_score += Pst.EG[pcolor | (piece & Piece.TYPE_MASK)][sq]
+        self.phase += Pst.PHASE[piece & Piece.TYPE_MASK]
+        self.bitboards[pcolor | (piece & Piece.TYPE_MASK)] |= bit
+        self.occupancy[pcolor] |= bit
+        self.occupied |= bit
+        self.all_pieces[pcolor][piece & Piece.TYPE_MASK][piece] = divmod(sq, 8)
+        if self.nnue is not None:
+            self.nnue.add_piece(piece, sq)
+
+    def remove_piece(self, sq: int) -> int:
+        """Remove the piece from a square and return it."""
+        piece = self.squares[sq]
+        pcolor = piece & Piece.COLOR_MASK
+        bit = SQUARE_BB[sq]
+        self.squares[sq] = Piece.EMPTY
+        self.state.flat[sq] = Piece.EMPTY
+        self.key ^= Zobrist.PIECE_KEYS[pcolor | (piece & Piece.TYPE_MASK)][sq]
+        if piece & Piece.TYPE_MASK == Piece.PAWN:
+            self.pawn_key ^= Zobrist.PIECE_KEYS[pcolor | Piece.PAWN][sq]
+        self.mg_score -= Pst.MG[pcolor | (piece & Piece.TYPE_MASK)][sq]
+        self.eg_score -= Pst.EG[pcolor | (piece & Piece.TYPE_MASK)][sq]
+        self.phase -= Pst.PHASE[piece & Piece.TYPE_MASK]
+        self.bitboards[pcolor | (piece & Piece.TYPE_MASK)] ^= bit
+        self.occupancy[pcolor] ^= bit
+        self.occupied ^= bit
+        self.all_pieces[pcolor][piece & Piece.TYPE_MASK].pop(piece)
+        if self.nnue is not None:
+            self.nnue.remove_piece(piece, sq)
+        return piece
+
+    def move_piece(self, start_sq: int, end_sq: int) -> None:
+        """Move a piece to an empty square."""
+        piece = self.squares[start_sq]
+        pcolor = piece & Piece.COLOR_MASK
+        move_bb = SQUARE_BB[start_sq] | SQUARE_BB[end_sq]
+        self.squares[start_sq] = Piece.EMPTY
+        self.squares[end_sq] = piece
+        self.state.flat[start_sq] = Piece.EMPTY
+        self.state.flat[end_sq] = piece
+        piece_keys = Zobrist.PIECE_KEYS[pcolor | (piece & Piece.TYPE_MASK)]
+        self.key ^= piece_keys[start_sq] ^ piece_keys[end_sq]
+        if piece & Piece.TYPE_MASK == Piece.PAWN:
+            self.pawn_key ^= piece_keys[start_sq] ^ piece_keys[end_sq]
+        mg_table = Pst.MG[pcolor | (piece & Piece.TYPE_MASK)]
+        eg_table = Pst.EG[pcolor | (piece & Piece.TYPE_MASK)]
+        self.mg_score += mg_table[end_sq] - mg_table[start_sq]
+        self.eg_score += eg_table[end_sq] - eg_table[start_sq]
+        self.bitboards[pcolor | (piece & Piece.TYPE_MASK)] ^= move_bb
+        self.occupancy[pcolor] ^= move_bb
+        self.occupied ^= move_bb
+        self.all_pieces[pcolor][piece & Piece.TYPE_MASK][piece] = divmod(end_sq, 8)
+        if self.nnue is not None:
+            self.nnue.move_piece(piece, start_sq, end_sq)
+
+    def piece_at(self, sq: int) -> int:
+        """Return the piece code on a square index."""
+        return self.squares[sq]
 
     @staticmethod
     def get_piece(state: np.ndarray, coords: Tuple[int, int]) -> int:
@@ -232,11 +482,11 @@ class Board:
 
     def are_coords_empty(self, coords_list: List[Tuple[int, int]]) -> bool:
         """Check if ALL the given coords are empty."""
-        return all(self.state[coords] == Piece.EMPTY for coords in coords_list)
+        return not self.occupied & Bitboards.from_coords(coords_list)
 
     def get_fen(self) -> str:
         """Get the fen for the board."""
-        self.fen = Fen.create_fen(self.state, self.color_to_move, self.castle_rights, self.en_passant, self.half_move_clock, self.full_move)
+        self.fen = Fen.create_fen(self.bitboards, self.color_to_move, self.castle_rights, self.en_passant, self.half_move_clock, self.full_move)
         return self.fen
 
     def __str__(self):
@@ -1,6 +1,7 @@
 """Module for FEN notation."""
 import numpy as np
 from typing import Dict, List, Literal, Optional, Tuple
+from .bitboard import Bitboards
 from .board_utils import BoardUtils
 from chess.pieces.piece import Piece
 
@@ -8,6 +9,19 @@ from chess.pieces.piece import Piece
 class Fen:
     """A class for representing a fen string."""
 
+    # The specific piece codes handed out in order to the pieces of a colour and type.
+    # Promoted pieces keep the code of their pawn, so the extra codes never clash with them.
+    EXTRA_PIECES = (0xB0, 0xC0, 0xD0, 0xE0, 0xF0)
+    SPECIFIC_PIECES: Dict[int, Tuple[int, ...]] = {
+        Piece.KING: (0,),
+        Piece.PAWN: (Piece.A_PAWN, Piece.B_PAWN, Piece.C_PAWN, Piece.D_PAWN,
+                     Piece.E_PAWN, Piece.F_PAWN, Piece.G_PAWN, Piece.H_PAWN),
+        Piece.KNIGHT: (Piece.LEFT_PIECE, Piece.RIGHT_PIECE) + EXTRA_PIECES,
+        Piece.BISHOP: (Piece.LEFT_PIECE, Piece.RIGHT_PIECE) + EXTRA_PIECES,
+        Piece.ROOK: (Piece.LEFT_PIECE, Piece.RIGHT_PIECE) + EXTRA_PIECES,
+        Piece.QUEEN: (0, Piece.LEFT_PIECE, Piece.RIGHT_PIECE) + EXTRA_PIECES,
+    }
+
     @staticmethod
     def create_fen(
         state,
@@ -17,7 +31,12 @@ class Fen:
         half_move_clock: int = 0,
         fullmove_number: int = 1,
     ) -> str:
-        """Given the board state it produces the fen string."""
+        """Given the board state it produces the fen string.
+
+        The state can either be the 8x8 numpy array or the dict of piece bitboards.
+        """
+        if isinstance(state, dict):
+            state = Bitboards.to_state(Bitboards.to_squares(state))
         state_f: str = Fen.__get_state_fen(state)
         # Remove the symbol '/'
         # fen = fen[:-1] + " " + self.get_castling_fen() + " " + self.get_en_passant_fen() + " " + str(self.half_move_clock) + " " + str(self.full_move_number)
@@ -86,12 +105,10 @@ class Fen:
     def make_state_and_pieces(state_fen: str):
         pieces = []
         pos: int = 0
-        pawns_count: int = 0
-        knights_count: int = 0
-        bishops_count: int = 0
-        rooks_count: int = 0
+        # Every piece of the same colour and type needs its own code, so we count them per colour.
+        counts: Dict[int, int] = {}
+        symbol_types = {"k": Piece.KING, "p": Piece.PAWN, "n": Piece.KNIGHT, "b": Piece.BISHOP, "r": Piece.ROOK, "q": Piece.QUEEN}
 
-        piece_pos = {0: Piece.LEFT_PIECE, 1: Piece.RIGHT_PIECE}
         # Parse the pieces and the tiles
         for ch in state_fen:
             # Needs a regex to check if the fen is valid
@@ -100,45 +117,21 @@ class Fen:
             if ch in "12345678":
                 pos += int(ch)
                 continue
-            piece = 0
-            piece |= Piece.WHITE if ch.isupper() else Piece.BLACK
             chl = ch.lower()
-            if chl == "k":
-                piece |= Piece.KING
-            elif chl == "p":
-                piece |= Piece.PAWN
-                piece |= {0: Piece.A_PAWN, 1: Piece.B_PAWN, 2: Piece.C_PAWN, 3: Piece.D_PAWN,
-                               4: Piece.E_PAWN, 5: Piece.F_PAWN, 6: Piece.G_PAWN, 7: Piece.H_PAWN}[pawns_count]
-                pawns_count += 1
-                if pawns_count == 8:
-                    pawns_count = 0
-            elif chl == "n":
-                piece |= Piece.KNIGHT
-                piece |= piece_pos[knights_count]
-                knights_count += 1
-                if knights_count == 2:
-                    knights_count = 0
-            elif chl == "b":
-                piece |= Piece.BISHOP
-                piece |= piece_pos[bishops_count]
-                bishops_count += 1
-                if bishops_count == 2:
-                    bishops_count = 0
-            elif chl == "r":
-                piece |= Piece.ROOK
-                piece |= piece_pos[rooks_count]
-                rooks_count += 1
-                if rooks_count == 2:
-                    rooks_count = 0
-            elif chl == "q":
-                piece |= Piece.QUEEN
-            elif chl == "/":
+            if chl == "/":
                 continue
             elif chl == " ":
                 break
             # TODO Should check with a regex.
-            else:
+            elif chl not in symbol_types:
                 raise ValueError(f"Unkown symbol in fen: {chl}")
+            kind = (Piece.WHITE if ch.isupper() else Piece.BLACK) | symbol_types[chl]
+            specific_pieces = Fen.SPECIFIC_PIECES[symbol_types[chl]]
+            count = counts.get(kind, 0)
+            if count >= len(specific_pieces):
+                raise ValueError(f"Too many pieces of the same kind in fen: {ch}")
+            piece = kind | specific_pieces[count]
+            counts[kind] = count + 1
             row = pos // 8
             col = pos - row * 8
             pieces.append((piece, (row, col)))
@@ -162,16 +155,16 @@ class Fen:
                 # Queen side == Left side
                 castling[Piece.WHITE][0] = True
             elif ch == "k":
-                castling[Piece.BLACK][0] = True
-            elif ch == "q":
                 castling[Piece.BLACK][1] = True
+            elif ch == "q":
+                castling[Piece.BLACK][0] = True
         return castling
 
     @staticmethod
     def create_en_passant_coords(en_passant_fen: str) -> Optional[Tuple[int, int]]:
         """Create the en passant coords based on the given en_passant_fen.
 
-        For example if en_passant_fen is "e3" then the en passant coords are [4, 3].
+        For example if en_passant_fen is "e3" then the en passant coords are (5, 4).
 
         Parameters
         ----------
@@ -185,7 +178,7 @@ class Fen:
         """
         if en_passant_fen == "-":
             return None
-        return BoardUtils.get_number_for_col(en_passant_fen[0]), int(en_passant_fen[1])
+        return 8 - int(en_passant_fen[1]), BoardUtils.get_number_for_col(en_passant_fen[0])
 
     @staticmethod
     def translate_to_state(fen: str):
@@ -226,3 +219,20 @@ class Fen:
         en_passant: Optional[Tuple[int, int]] = Fen.create_en_passant_coords(en_passant_fen)
 
         return pieces, colour_to_move, castling, en_passant, int(halfmove_fen), int(fullmove_fen)
+
+    @staticmethod
+    def translate_to_bitboards(fen: str):
+        """Same as translate_to_state but the pieces come back as bitboards.
+
+        Parameters
+        ----------
+        fen : str
+            A way to represent a chess board state.
+
+        Returns
+        -------
+        bitboards : Dict[int, int]
+            One bitboard for each colour and piece type.
+        """
+        pieces, colour_to_move, castling, en_passant, half_move, full_move = Fen.translate_to_state(fen)
+        return Bitboards.from_pieces(pieces), colour_to_move, castling, en_passant, half_move, full_move
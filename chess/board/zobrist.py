@@ -0,0 +1,57 @@
+"""Zobrist keys for hashing board positions.
+
+A position key is the XOR of one random 64-bit number per (piece kind, square),
+one for the side to move when black is to play, one per castle rights
+combination and one per en passant file.  The numbers come from a seeded
+generator so keys are stable between runs and processes.
+
+The pawn key only hashes the pawns, with the same piece keys, starting from
+NO_PAWNS so that a position without pawns does not get key 0.
+"""
+import random
+from typing import Dict, List
+
+from .bitboard import PIECE_KINDS
+from chess.pieces.piece import Piece
+
+ZOBRIST_SEED = 0x5EED_C4E55
+_rng = random.Random(ZOBRIST_SEED)
+
+
+class Zobrist:
+    """Random keys and the helpers to hash a position from scratch."""
+
+    PIECE_KEYS: Dict[int, List[int]] = {kind: [_rng.getrandbits(64) for _ in range(64)] for kind in PIECE_KINDS}
+    BLACK_TO_MOVE: int = _rng.getrandbits(64)
+    # Indexed by the 4 castling bits of the Board.
+    CASTLE_KEYS: List[int] = [_rng.getrandbits(64) for _ in range(16)]
+    EN_PASSANT_KEYS: List[int] = [_rng.getrandbits(64) for _ in range(8)]
+    NO_PAWNS: int = _rng.getrandbits(64)
+
+    @staticmethod
+    def piece_key(piece: int, sq: int) -> int:
+        """Key of a piece code on a square, the specific piece bits are ignored."""
+        return Zobrist.PIECE_KEYS[piece & (Piece.COLOR_MASK | Piece.TYPE_MASK)][sq]
+
+    @staticmethod
+    def compute(board) -> int:
+        """Hash a board from scratch, used to set up and verify the incremental key."""
+        key = 0
+        for sq, piece in enumerate(board.squares):
+            if piece != Piece.EMPTY:
+                key ^= Zobrist.piece_key(piece, sq)
+        if board.color_to_move == Piece.BLACK:
+            key ^= Zobrist.BLACK_TO_MOVE
+        key ^= Zobrist.CASTLE_KEYS[board.castling]
+        if board.en_passant is not None:
+            key ^= Zobrist.EN_PASSANT_KEYS[board.en_passant[1]]
+        return key
+
+    @staticmethod
+    def compute_pawn_key(board) -> int:
+        """Hash only the pawns of a board from scratch, used to set up and verify the incremental pawn key."""
+        key = Zobrist.NO_PAWNS
+        for sq, piece in enumerate(board.squares):
+            if piece & Piece.TYPE_MASK == Piece.PAWN:
+                key ^= Zobrist.piece_key(piece, sq)
+        return key
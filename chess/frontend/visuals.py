@@ -7,7 +7,7 @@ from typing import List, Tuple, Optional, Any
 from colorama import Fore
 from chess.board.board import Board
 from itertools import chain
-from chess.ai.move_picker import random_legal_move
+from chess.ai.move_picker import search_move
 from chess.pieces.piece import Piece
 
 
@@ -84,6 +84,7 @@ class GameVisuals:
         self.is_running: bool = False
         self.is_piece_picked: bool = False
         self.promoting_piece: Optional[np.uint32] = None
+        self.promoting_move: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None
         self.clock = py_g.time.Clock()
         self.screen = py_g.display.set_mode(VISUAL_BOARD_SIZE)
         self.picked_piece = {"img": None, "coords": None}
@@ -209,10 +210,13 @@ class GameVisuals:
         self.is_running = True
 
         while self.is_running:
-            # NOTE: Make it a more dynamic so the player and PC have different colours.
             # Check if its the PC's turn
-            if self.game.player2 == 'PC':
-                move_coords = random_legal_move(game=self.game)
+            if self.game.board.color_to_move == self.game.player1_color:
+                player = self.game.player1
+            else:
+                player = self.game.player2
+            if player == 'PC':
+                move_coords = search_move(game=self.game)
                 if move_coords is None:
                     print("GG no legal moves")
                 else:
@@ -254,9 +258,8 @@ class GameVisuals:
             if self.is_piece_picked:
                 self.draw_picked_piece(m_pos=(mx, my))
 
-            if self.show_imgs:
-                self.game.generate_all_moves(self.game.board.state, self.game.board.all_pieces, self.game.board.castle_rights, self.game.board.en_passant, 2)
-                # self.draw_imgs()
+            # if self.show_imgs:
+            #     self.draw_imgs()
 
             if self.show_indexes:
                 self.draw_indexes()
@@ -286,8 +289,10 @@ class GameVisuals:
                 prom_type = None
 
         if prom_type is not None:
-            Board.promote_to(self.game.board.state, self.promoting_piece, prom_type)
+            # The move is only played once we know what the pawn turns into.
+            self.game.make_move(*self.promoting_move, prom_type)
             self.promoting_piece = None
+            self.promoting_move = None
 
     def try_place_piece(self, m_pos) -> bool:
         # sourcery skip: inline-immediately-returned-variable
@@ -321,7 +326,9 @@ class GameVisuals:
                 #     "b": Piece.BISHOP,
                 # }[prom]
                 self.promoting_piece = self.game.board.state[start_coords]
-            self.game.make_move(self.picked_piece["coords"], clicked_coords)
+                self.promoting_move = (start_coords, clicked_coords)
+            else:
+                self.game.make_move(self.picked_piece["coords"], clicked_coords)
             print(self.game.board)
             self.load_state(self.game.board.state)
             self.change_cursor("arrow")
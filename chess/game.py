@@ -4,12 +4,14 @@ import numpy as np
 from uuid import UUID
 from typing import List, Tuple, Optional, Set
 
-from chess.board import Board, BoardUtils, Fen
+from chess.board import Board, BoardUtils
 from datetime import datetime
 from chess.moves.movegenerator import MoveGenerator
 from chess.pieces.piece import Piece, CastleSide
 from chess.moves.move import Move, MoveDecoder
 from chess.frontend.visuals import GameVisuals
+from chess.perft import perft
+from chess.ai.search import Search
 
 
 STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
@@ -34,9 +36,11 @@ class Game:
         self.player1 = player1
         self.player2 = player2
         self.board: Board = Board(STARTING_FEN)
+        self.board.correct_format_print()
         self.running: bool = True
         # self.moves_history:
         self.movegen: MoveGenerator = MoveGenerator(self.board)
+        self.search: Search = Search(self.board)
         self.visuals: bool = visuals
         self.moves_history: List[Move] = []
         self.player1_color = Piece.WHITE
@@ -67,8 +71,9 @@ class Game:
                         "k": Piece.KNIGHT,
                         "b": Piece.BISHOP,
                     }[prom]
-                    Board.promote_to(self.board.state, self.board.state[start_coords], prom_type)
-                self.make_move(start_coords, end_coords)
+                else:
+                    prom_type = Piece.EMPTY
+                self.make_move(start_coords, end_coords, prom_type)
                 # Reveal board state.
                 self.board.correct_format_print()
             else:
@@ -114,25 +119,17 @@ class Game:
 
         return end_coords in legal_piece_coords
     
-    def get_legal_coords(self, start_coords):
-        all_possible_coords = self.get_piece_possible_coords(start_coords)
-        print(self.board)
-        # Remove the illegal moves
-        all_possible_coords -= self.get_piece_illegal_coords(start_coords, self.board.state[start_coords], all_possible_coords)
-        print(self.board)
-        return all_possible_coords
-
-    def get_all_possible_moves(self) -> List[Tuple[int, Tuple[int, int]]]:
-        """Get all the possible moves."""
-        # colors_turn = Piece.WHITE if  else Piece.BLACK
-        moves = []
-        # for color in [Piece.WHITE, Piece.BLACK]:
-        #     for _, piece_list in all_pieces[color].items():
-        #         for piece, pstart_coords in piece_list.items():
-        #             coords_set = set()
-        #             coords_set = Game.get_legal_coords(state, castle_rights, en_passant, pstart_coords)
-        #             moves.append((pstart_coords, coords_set))
-        return moves
+    def get_legal_coords(self, start_coords: Tuple[int, int]) -> Set[Tuple[int, int]]:
+        """Get the coords the piece on start_coords can legally move to."""
+        start_sq = BoardUtils.get_index_from_coords(start_coords)
+        return {divmod(end_sq, 8) for sq, end_sq, _ in self.movegen.get_legal_moves() if sq == start_sq}
+
+    def get_all_possible_moves(self) -> List[Tuple[Tuple[int, int], Set[Tuple[int, int]]]]:
+        """Get the legal moves of the side to move grouped by piece, as (start coords, end coords set) pairs."""
+        moves = {}
+        for move in self.movegen.get_all_moves():
+            moves.setdefault(Move.get_start_coords(move), set()).add(Move.get_end_coords(move))
+        return list(moves.items())
 
     def get_last_played_move(self) -> Optional[Move]:
         """Get the last played move."""
@@ -148,102 +145,13 @@ class Game:
                 coords_set = coords_set | castling_moves
         return coords_set
 
-    # def generate_all_moves(self, depth: int) -> int:
-    #     if depth == 0:
-    #         return 1
-
-    #     num_posistions = 0
-
-    #     @Game.simulate_move
-    #     def play_move(state, en_passant, start_coords, end_coords) -> None:
-    #         # _, _, en_passant, _ = self.update_board(castle_rights, en_passant, 0, start_coords, end_coords)
-    #         num_posistions += self.generate_all_moves(depth - 1)
-
-    #     all_moves: List[Tuple[int, Tuple[int, int]]]
-    #     all_moves = self.get_all_possible_moves()
-    #     for start_coords, coords in all_moves:
-    #         for crd in coords:
-    #             play_move(state, start_coords, crd)
-
-    #     return num_posistions
+    def generate_all_moves(self, depth: int) -> int:
+        """Count the positions reachable from the current one in depth moves (perft)."""
+        return perft(self.board, depth)
 
     def get_castling_coords(self, piece: np.uint32) -> Set[Tuple[int, int]]:
         """Try adding the roke moves if they are valid."""
-        castle_coords = set()
-
-        pcolor = Piece.get_color(piece)
-        enemies = self.board.get_enemies(Piece.get_color(piece))
-        # Right castle
-        if self.board.castle_rights[pcolor][1]:
-            rcastle: Optional[List[Tuple[int, int]]] = Piece.get_castle_coords(piece, Piece.RIGHT_PIECE)
-            if rcastle and not self.movegen.are_coords_under_attack(rcastle, pcolor) and self.board.are_coords_empty(rcastle):
-                castle_coords.add((7, 6) if pcolor == Piece.WHITE else (0, 6))
-
-        # Left castle
-        if self.board.castle_rights[pcolor][0]:
-            lcastle: Optional[List[Tuple[int, int]]] = Piece.get_castle_coords(piece, Piece.LEFT_PIECE)
-            if lcastle and not self.movegen.are_coords_under_attack(lcastle, pcolor) and self.board.are_coords_empty(lcastle):
-                castle_coords.add((7, 2) if pcolor == Piece.WHITE else (0, 2))
-        return castle_coords
-
-    def get_piece_illegal_coords(self, start_coords: Tuple[int, int], piece: np.uint32, coords_set: Set[Tuple[int, int]]) -> Set[Tuple[int, int]]:
-        """Get the illegal coords.
-
-        Parameters
-        ----------
-        piece : Piece
-            The moving piece.
-        start_coords : tuple(int)
-            His starting pos.
-        coords_set : set
-            The possible coords.
-
-        Returns
-        -------
-        set
-            All the illegal moves
-        """
-        # For each simulated move, if the king is in check, then the move is invalid.
-        sim_state = Board.simulate_state(self.board.state)
-        pcolor = Piece.get_color(piece)
-        enemies = self.board.get_enemies(pcolor)
-        illegal_coords = set()
-
-        @self.simulate_move
-        def __play_possibly_illegal_move(sim_state, start_coords, end_coords):
-            # We do not use this func:
-            # self.board.get_king_coords(pcolor)
-            # Because we want to simulate the move without updating the board.
-            king_coords = tuple(map(int, Board.find_king(sim_state, pcolor)))
-            is_king_in_check = self.movegen.is_king_in_check(enemies, king_coords)
-            if is_king_in_check:
-                illegal_coords.add(end_coords)
-
-        for crd in coords_set:
-            __play_possibly_illegal_move(sim_state, start_coords, crd)
-        return illegal_coords
-
-    def simulate_move(self, func):
-        """Simulate a move decorator.
-
-        If a given functions changes the board state by playing a move,
-        simple revert to its original state before the move.
-        Parameters
-        ----------
-        func : function
-            The function that should changes a board state.
-        """
-        def __sim_seq(state, piece, start_coords, end_coords):
-            state[end_coords] = piece
-            state[start_coords] = Piece.EMPTY
-
-        def __simulate_move(state, start_coords: tuple, end_coords: tuple) -> None:
-            piece = state[start_coords]
-            __sim_seq(state, piece, start_coords=start_coords, end_coords=end_coords)
-            func(state, start_coords, end_coords)
-            # Simpliest thing to do simulate back what you simulated above.
-            __sim_seq(state, piece, start_coords=end_coords, end_coords=start_coords)
-        return __simulate_move
+        return self.movegen.get_castling_coords(piece)
 
     def is_piece_turn(self, start_coords):
         return Piece.get_color(self.board.state[start_coords]) == self.board.color_to_move
@@ -254,138 +162,69 @@ class Game:
             return self.is_move_valid(start_coords, end_coords)
         return False
 
-    def make_move(self, start_coords: Tuple[int, int], end_coords: Tuple[int, int]) -> Move:
-
+    def make_move(self, start_coords: Tuple[int, int], end_coords: Tuple[int, int], prom_type: int = Piece.EMPTY) -> Move:
         """Register the a move.
 
-        Find the Piece objs on the given coords and change their attr accordantly.
+        Play the move on the board and keep it in the moves history.
         Parameters
         ----------
         start_coords : tuple
             The old coords of the piece.
         end_coords : tuple
             The new coords of the piece.
+        prom_type : int
+            The piece type a promoting pawn turns into, a queen if not given.
         """
-        # NOTE Make it possible so the Pawn can transform here.
-        castle_side: Optional[int]
-        moving_piece, castle_side = self.update_board(start_coords, end_coords)
-        # Change the turn.
-        self.board.color_to_move = BoardUtils.swap_colors(self.board.color_to_move)
-
         # Last move new fen is no the new old fen.
         old_fen = self.board.fen if len(self.moves_history) == 0 else self.moves_history[-1].curr_fen
-        curr_fen = Fen.create_fen(self.board.state, Piece.get_color(moving_piece), self.board.castle_rights, self.board.en_passant, self.board.half_move_clock, self.board.full_move)
+        castle_side: Optional[int]
+        moving_piece, castle_side = self.update_board(start_coords, end_coords, prom_type)
+
+        curr_fen = self.board.get_fen()
         move = Move(len(self.moves_history), moving_piece, start_coords, end_coords, castle_side, old_fen, curr_fen)
         self.moves_history.append(move)
         return move
 
-    def unmake_move(self, start_coords: Tuple[int, int], end_coords: Tuple[int, int]) -> Move:
+    def unmake_move(self) -> Optional[Move]:
+        """Take back the last registered move.
 
-        """Register the a move.
-
-        Find the Piece objs on the given coords and change their attr accordantly.
-        Parameters
-        ----------
-        start_coords : tuple
-            The old coords of the piece.
-        end_coords : tuple
-            The new coords of the piece.
+        Returns
+        -------
+        Optional[Move]
+            The move that got taken back, None if no move was played yet.
         """
-        # NOTE Make it possible so the Pawn can transform here.
-        castle_side: Optional[int]
-        moving_piece, castle_side = self.update_board(start_coords, end_coords)
-        # Change the turn.
-        self.board.color_to_move = BoardUtils.swap_colors(self.board.color_to_move)
+        if not self.moves_history:
+            return None
+        self.board.unmake_move()
+        self.board.get_fen()
+        return self.moves_history.pop()
 
-        # Last move new fen is no the new old fen.
-        old_fen = self.board.fen if len(self.moves_history) == 0 else self.moves_history[-1].curr_fen
-        curr_fen = Fen.create_fen(self.board.state, Piece.get_color(moving_piece), self.board.castle_rights, self.board.en_passant, self.board.half_move_clock, self.board.full_move)
-        move = Move(len(self.moves_history), moving_piece, start_coords, end_coords, castle_side, old_fen, curr_fen)
-        self.moves_history.append(move)
-        return move
-
-    def update_board(self, start_coords: Tuple[int, int], end_coords: Tuple[int, int]):
+    def update_board(self, start_coords: Tuple[int, int], end_coords: Tuple[int, int], prom_type: int = Piece.EMPTY):
         """Update the board state and pieces.
 
         Parameters
         ----------
-        old_coords : tuple[int]
+        start_coords : tuple[int]
             Holds the starting coords of the piece.
-        new_coords : tuple[int]
+        end_coords : tuple[int]
             Holds the ending coords of the piece.
-        moving_piece : Piece
-            The Piece that is moving from the old coords to the new coords.
-        taken_piece : Piece
-            The Piece that is getting killed (if there is any) from the new coords.
+        prom_type : int
+            The piece type a promoting pawn turns into.
 
         Returns
         -------
-        Dict[List[int], List[int]]
-            If the moving piece is a King and the move was castling, return the castling info.
+        Tuple[int, Optional[int]]
+            The moving piece and if the move was castling, the castling side.
         """
-        # Change the colour that has to move next.
-        moving_piece = self.board.state[start_coords]
-        mpcolor = Piece.get_color(moving_piece)
-        mptype = Piece.get_type(moving_piece)
-
-        # Captured piece
-        captured_piece = self.board.state[end_coords]
-        cpcolor = Piece.get_color(captured_piece)
-        cptype = Piece.get_type(captured_piece)
-
-        self.board.try_update_castle_rights(moving_piece)
-        if mptype == Piece.PAWN:
-            if self.board.en_passant is not None and self.board.en_passant == end_coords:
-                # Only a white piece's en-passant square can be on 5th row.
-                if  self.board.en_passant[0] == 5:
-                    # Kill the white piece.
-                    self.board.state[self.board.en_passant[0] - 1, self.board.en_passant[1]] = Piece.EMPTY
-                elif self.board.en_passant[0] == 2:
-                    # Kill the black piece.
-                    self.board.state[self.board.en_passant[0] + 1, self.board.en_passant[1]] = Piece.EMPTY
-
-            if abs(start_coords[0] - end_coords[0]) > 1:
-                row_skipped = end_coords[0] + (1 if mpcolor == Piece.WHITE else -1)
-                self.board.en_passant = (row_skipped, end_coords[1])
-            else:
-                self.board.en_passant = None
+        moving_piece = self.board.squares[BoardUtils.get_index_from_coords(start_coords)]
 
         # Was the move a castling move?
         castle_side: Optional[int] = None
-        if mptype == Piece.KING:
-            # Try to get the castling side if it returns None then no castling move was made.
+        if Piece.get_type(moving_piece) == Piece.KING and abs(start_coords[1] - end_coords[1]) == 2:
             castle_side = CastleSide.get_side(end_coords)
-            if castle_side is not None:
-                self.__update_rook_castle_pos(castle_side)
-
-        # Update board state.
-        if captured_piece != Piece.EMPTY or mptype == Piece.PAWN:
-            self.board.half_move_clock = 0
-        else:
-            self.board.half_move_clock += 1 
-        
-        # Update moving piece coords
-        self.board.all_pieces[mpcolor][mptype][moving_piece] = end_coords
-        # Remove the captured piece.
-        if captured_piece != Piece.EMPTY:
-            self.board.all_pieces[cpcolor][cptype].pop(captured_piece)
-        self.board.state[end_coords] = self.board.state[start_coords]
-        self.board.state[start_coords] = Piece.EMPTY
-        self.board.full_move = len(self.moves_history) + 1
-        return moving_piece, castle_side
 
-    def __update_rook_castle_pos(self, castle_side: int) -> None:
-        """Update the rook's position based on the castling side.
-
-        Parameters
-        ----------
-        castling_side : int
-            Change the board state based on the castling side.
-        """
-        new_rook_coords, rook_coords = CastleSide.get_rook_posistions(castle_side)
-        # Change the coords of the rook and the board state.
-        self.board.state[new_rook_coords] = self.board.state[rook_coords]
-        self.board.state[rook_coords] = Piece.EMPTY
+        self.board.make_move(BoardUtils.get_index_from_coords(start_coords), BoardUtils.get_index_from_coords(end_coords), prom_type)
+        return moving_piece, castle_side
 
     def is_piece_pickable(self, piece: np.uint32) -> bool:
         """Determine if you can pick a piece.
@@ -0,0 +1,42 @@
+"""Precomputed attack tables for the leaping pieces.
+
+The tables are built once at import time and are indexed by square
+(0-63, see ``BoardUtils.get_index_from_coords``).  Each entry is a bitboard
+with the squares the piece attacks from there on an empty board.
+"""
+from typing import Dict, List, Tuple
+
+from chess.pieces.piece import Piece
+
+KNIGHT_OFFSETS: Tuple[Tuple[int, int], ...] = (
+    (-1, -2), (-2, -1), (1, -2), (2, -1),
+    (1, 2), (2, 1), (-1, 2), (-2, 1),
+)
+KING_OFFSETS: Tuple[Tuple[int, int], ...] = (
+    (-1, 0), (1, 0), (0, -1), (0, 1),
+    (-1, -1), (-1, 1), (1, -1), (1, 1),
+)
+# White pawns move up the board (towards row 0), black ones down.
+PAWN_OFFSETS: Dict[int, Tuple[Tuple[int, int], ...]] = {
+    Piece.WHITE: ((-1, -1), (-1, 1)),
+    Piece.BLACK: ((1, -1), (1, 1)),
+}
+
+
+def _build_table(offsets: Tuple[Tuple[int, int], ...]) -> List[int]:
+    """Build the attack bitboard of every square for a set of (row, col) offsets."""
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        bb = 0
+        for d_row, d_col in offsets:
+            t_row, t_col = row + d_row, col + d_col
+            if 0 <= t_row <= 7 and 0 <= t_col <= 7:
+                bb |= 1 << (t_row * 8 + t_col)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS: List[int] = _build_table(KNIGHT_OFFSETS)
+KING_ATTACKS: List[int] = _build_table(KING_OFFSETS)
+PAWN_ATTACKS: Dict[int, List[int]] = {color: _build_table(offsets) for color, offsets in PAWN_OFFSETS.items()}
@@ -1,6 +1,7 @@
 """Anything related to a move how it was executed."""
-from typing import Callable, Set, Tuple
+from typing import Callable, List, Set, Tuple
 from chess.board import BoardUtils
+from chess.pieces.piece import Piece
 import numpy as np
 import re
 
@@ -15,6 +16,7 @@ def WRONG_INPUT(u_input, msg="Wrong move input:"):
 PIECE_SYMBOLS = "rnbqk"
 TILE_NUMBERS = "12345678"
 TILE_NAMES = "abcdefgh"
+PROMOTION_SYMBOLS = {Piece.QUEEN: "q", Piece.ROOK: "r", Piece.BISHOP: "b", Piece.KNIGHT: "n"}
 
 """ We should hardcode this values so we can evaluate
     faster which moves are in-bounds or not. """
@@ -61,7 +63,18 @@ class Move:
     START_COORDS_MASK = 0b0000000000111111
     SECOND_COORDS_MASK = 0b0000111111000000
     FLAG_MASK = 0b1111000000000000
-
+    SQUARE_MASK = 0x3F
+    END_SHIFT = 6
+    FLAG_SHIFT = 12
+
+    PROMOTION_FLAGS = {
+        Piece.QUEEN: PROMOTE_QUEEN,
+        Piece.BISHOP: PROMOTE_BISHOP,
+        Piece.ROOK: PROMOTE_ROOK,
+        Piece.KNIGHT: PROMOTE_KNIGHT,
+    }
+    # Promotion type of every flag (PROMOTE_QUEEN to PROMOTE_KNIGHT), Piece.EMPTY for the flags that do not promote.
+    PROMOTION_TYPES: List[int] = [Piece.EMPTY] * 3 + [Piece.QUEEN, Piece.BISHOP, Piece.ROOK, Piece.KNIGHT] + [Piece.EMPTY] * 9
 
     def __init__(
         self,
@@ -81,24 +94,59 @@ class Move:
         self.castle_side = castle_side
         self.old_fen: str = old_fen
         self.curr_fen: str = curr_fen 
-    
-    @classmethod
-    def from_start_end_coords(cls, start_coords: Tuple[int, int], end_coords: Tuple[int, int]):
-        cls.move_value = BoardUtils.get_index_from_coords(start_coords)
-        cls.move_value |= BoardUtils.get_index_from_coords(end_coords)
-        return cls
-    
+
+    @staticmethod
+    def encode(start_sq: int, end_sq: int, flag: int = NORMAL) -> int:
+        """Pack a move in 16 bits."""
+        return start_sq | end_sq << Move.END_SHIFT | flag << Move.FLAG_SHIFT
+
+    @staticmethod
+    def decode(move_value: int) -> Tuple[int, int, int]:
+        """Unpack a move to the (start square, end square, promotion type) that Board.make_move takes."""
+        return (
+            move_value & Move.SQUARE_MASK,
+            (move_value >> Move.END_SHIFT) & Move.SQUARE_MASK,
+            Move.PROMOTION_TYPES[move_value >> Move.FLAG_SHIFT],
+        )
+
+    @staticmethod
+    def from_start_end_coords(start_coords: Tuple[int, int], end_coords: Tuple[int, int], flag: int = NORMAL) -> int:
+        """Pack a move given by its coords."""
+        return Move.encode(
+            BoardUtils.get_index_from_coords(start_coords), BoardUtils.get_index_from_coords(end_coords), flag
+        )
+
+    @staticmethod
+    def get_start_sq(move_value: int) -> int:
+        return move_value & Move.START_COORDS_MASK
+
+    @staticmethod
+    def get_end_sq(move_value: int) -> int:
+        return (move_value & Move.SECOND_COORDS_MASK) >> Move.END_SHIFT
+
     @staticmethod
     def get_start_coords(move_value: int) -> Tuple[int, int]:
         return BoardUtils.get_coords_from_index(move_value & Move.START_COORDS_MASK)
 
     @staticmethod
     def get_end_coords(move_value: int) -> Tuple[int, int]:
-        return BoardUtils.get_coords_from_index((move_value >> 5) & Move.SECOND_COORDS_MASK)
+        return BoardUtils.get_coords_from_index((move_value & Move.SECOND_COORDS_MASK) >> Move.END_SHIFT)
 
     @staticmethod
     def get_flag(move_value: int) -> int:
-        return (move_value >> 11) & Move.FLAG_MASK
+        return (move_value & Move.FLAG_MASK) >> Move.FLAG_SHIFT
+
+    @staticmethod
+    def get_promotion_type(move_value: int) -> int:
+        """The piece type the move promotes to, Piece.EMPTY when it does not promote."""
+        return Move.PROMOTION_TYPES[move_value >> Move.FLAG_SHIFT]
+
+    @staticmethod
+    def to_str(move_value: int) -> str:
+        """Long algebraic notation of a packed move, e.g. 'e2e4' or 'e7e8q'."""
+        move_str = MoveDecoder.encode_to_str(Move.get_start_coords(move_value))
+        move_str += MoveDecoder.encode_to_str(Move.get_end_coords(move_value))
+        return move_str + PROMOTION_SYMBOLS.get(Move.get_promotion_type(move_value), "")
 
     @staticmethod
     def get_direction_func(direction: int) -> Callable:
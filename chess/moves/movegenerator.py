@@ -1,25 +1,333 @@
 import numpy as np
+from array import array
 from .move import Move
 from chess.moves.piecesmoves import PiecesMoves
+from .attacks import KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS
+from .sliders import BETWEEN, LINE, bishop_attacks, queen_attacks, rook_attacks
 from typing import Literal, Tuple, List, Set, Callable, Dict, Optional
 from chess.pieces.piece import Piece
 from chess.board import Board, BoardUtils
+from chess.board.bitboard import FULL_BB, SQUARE_BB, Bitboards
+
+PROMOTION_TYPES = (Piece.QUEEN, Piece.ROOK, Piece.BISHOP, Piece.KNIGHT)
+PROMOTION_FLAGS = tuple(Move.PROMOTION_FLAGS[prom_type] for prom_type in PROMOTION_TYPES)
+# The first and last rank, a pawn getting there promotes.
+PROMOTION_RANKS = 0xFF | 0xFF << 56
+SLIDER_ATTACKS: Dict[int, Callable[[int, int], int]] = {
+    Piece.BISHOP: bishop_attacks,
+    Piece.ROOK: rook_attacks,
+    Piece.QUEEN: queen_attacks,
+}
+# (castling bit, king destination, square the king passes, squares that must be empty, rook square) per side.
+CASTLINGS: Dict[int, Tuple[Tuple[int, int, int, int, int], ...]] = {
+    Piece.WHITE: (
+        (Board.WR_CASTLE, 62, 61, SQUARE_BB[61] | SQUARE_BB[62], 63),
+        (Board.WL_CASTLE, 58, 59, SQUARE_BB[57] | SQUARE_BB[58] | SQUARE_BB[59], 56),
+    ),
+    Piece.BLACK: (
+        (Board.BR_CASTLE, 6, 5, SQUARE_BB[5] | SQUARE_BB[6], 7),
+        (Board.BL_CASTLE, 2, 3, SQUARE_BB[1] | SQUARE_BB[2] | SQUARE_BB[3], 0),
+    ),
+}
 
 class MoveGenerator:
 
     def __init__(self, board: Board) -> None:
         self.board = board
     
-    def get_all_moves(self) -> List[Tuple[np.uint32, Tuple[int, int]]]:
-        ...
+    def get_all_moves(self, moves: Optional[array] = None, captures_only: bool = False) -> array:
+        """Return every legal move of the side to move packed in 16 bits (see Move).
+
+        The checkers, the check mask and the pins are worked out once (see
+        _checks_and_pins) and the targets of every piece are cut down with them,
+        so no move has to be tried on the board.
+
+        Parameters
+        ----------
+        moves : array, optional
+            An array('H') to fill, its old content is dropped. A search keeps one per ply to reuse the memory.
+        captures_only : bool
+            Only the captures and promotions, what a quiescence search needs.
+
+        Returns
+        -------
+        array
+            The packed moves, castling, en passant, double pawn pushes and promotions carry their flag.
+        """
+        if moves is None:
+            moves = array("H")
+        else:
+            del moves[:]
+        add = moves.append
+        board = self.board
+        color = board.color_to_move
+        ecolor = Piece.get_enemy_color(color)
+        bitboards = board.bitboards
+        own = board.occupancy[color]
+        occupied = board.occupied
+        ksq, checkers, check_mask, pins = self._checks_and_pins()
+        # The squares the pieces may land on.
+        target_mask = board.occupancy[ecolor] if captures_only else ~own
+
+        without_king = occupied ^ SQUARE_BB[ksq]
+        for end_sq in Bitboards.iter_squares(KING_ATTACKS[ksq] & target_mask):
+            if not self.is_attacked(end_sq, ecolor, without_king):
+                add(ksq | end_sq << Move.END_SHIFT)
+        if not check_mask:
+            return moves
+        if not checkers and not captures_only:
+            for end_sq in Bitboards.iter_squares(self._castling_targets(ksq, color)):
+                add(ksq | end_sq << Move.END_SHIFT | Move.CASTLE << Move.FLAG_SHIFT)
+
+        for sq in Bitboards.iter_squares(bitboards[color | Piece.KNIGHT]):
+            if sq not in pins:
+                for end_sq in Bitboards.iter_squares(KNIGHT_ATTACKS[sq] & target_mask & check_mask):
+                    add(sq | end_sq << Move.END_SHIFT)
+        for ptype, attacks_func in SLIDER_ATTACKS.items():
+            for sq in Bitboards.iter_squares(bitboards[color | ptype]):
+                targets = attacks_func(sq, occupied) & target_mask & check_mask
+                if sq in pins:
+                    targets &= pins[sq]
+                for end_sq in Bitboards.iter_squares(targets):
+                    add(sq | end_sq << Move.END_SHIFT)
+
+        ep_sq = -1 if board.en_passant is None else board.en_passant[0] * 8 + board.en_passant[1]
+        if captures_only:
+            target_mask |= PROMOTION_RANKS | (SQUARE_BB[ep_sq] if ep_sq >= 0 else 0)
+        for sq, targets in self._pawn_targets(color, check_mask, pins):
+            for end_sq in Bitboards.iter_squares(targets & target_mask):
+                move = sq | end_sq << Move.END_SHIFT
+                if SQUARE_BB[end_sq] & PROMOTION_RANKS:
+                    for flag in PROMOTION_FLAGS:
+                        add(move | flag << Move.FLAG_SHIFT)
+                elif end_sq == ep_sq:
+                    add(move | Move.EN_PASSANT_CAPTURE << Move.FLAG_SHIFT)
+                elif end_sq - sq in (16, -16):
+                    add(move | Move.PAWN_TWO_STEP << Move.FLAG_SHIFT)
+                else:
+                    add(move)
+        return moves
+
+    def get_legal_moves(self) -> List[Tuple[int, int, int]]:
+        """Return every legal move of the side to move unpacked.
+
+        Returns
+        -------
+        List[Tuple[int, int, int]]
+            (start square, end square, promotion type) with Piece.EMPTY as the type of non promoting moves.
+        """
+        return [Move.decode(move) for move in self.get_all_moves()]
+
+    def count_legal_moves(self) -> int:
+        """Count the legal moves of the side to move without playing any of them.
+
+        Only the number is needed at the leaves of perft and for mobility, so the
+        targets of every piece are cut down with the check and pin masks and
+        counted as bitboards.
+        """
+        board = self.board
+        color = board.color_to_move
+        ecolor = Piece.get_enemy_color(color)
+        bitboards = board.bitboards
+        own = board.occupancy[color]
+        occupied = board.occupied
+        ksq, checkers, check_mask, pins = self._checks_and_pins()
+
+        count = 0
+        # The king is taken off the board so it can not hide from a slider behind itself.
+        without_king = occupied ^ SQUARE_BB[ksq]
+        for sq in Bitboards.iter_squares(KING_ATTACKS[ksq] & ~own):
+            if not self.is_attacked(sq, ecolor, without_king):
+                count += 1
+        if not check_mask:
+            # Double check, only the king can move.
+            return count
+        if not checkers:
+            count += Bitboards.popcount(self._castling_targets(ksq, color))
+
+        for sq in Bitboards.iter_squares(bitboards[color | Piece.KNIGHT]):
+            if sq not in pins:
+                count += Bitboards.popcount(KNIGHT_ATTACKS[sq] & ~own & check_mask)
+        for ptype, attacks_func in SLIDER_ATTACKS.items():
+            for sq in Bitboards.iter_squares(bitboards[color | ptype]):
+                targets = attacks_func(sq, occupied) & ~own & check_mask
+                if sq in pins:
+                    targets &= pins[sq]
+                count += Bitboards.popcount(targets)
+
+        for sq, targets in self._pawn_targets(color, check_mask, pins):
+            if targets & PROMOTION_RANKS:
+                count += 4 * Bitboards.popcount(targets & PROMOTION_RANKS) + Bitboards.popcount(targets & ~PROMOTION_RANKS)
+            else:
+                count += Bitboards.popcount(targets)
+        return count
+
+    def _attackers_to(self, sq: int, by_color: int, occupied: int) -> int:
+        """Bitboard of the by_color pieces attacking sq, the sliders are blocked by the given occupancy."""
+        bitboards = self.board.bitboards
+        queens = bitboards[by_color | Piece.QUEEN]
+        return (
+            KNIGHT_ATTACKS[sq] & bitboards[by_color | Piece.KNIGHT]
+            | KING_ATTACKS[sq] & bitboards[by_color | Piece.KING]
+            | PAWN_ATTACKS[Piece.get_enemy_color(by_color)][sq] & bitboards[by_color | Piece.PAWN]
+            | rook_attacks(sq, occupied) & (bitboards[by_color | Piece.ROOK] | queens)
+            | bishop_attacks(sq, occupied) & (bitboards[by_color | Piece.BISHOP] | queens)
+        )
+
+    def _checks_and_pins(self) -> Tuple[int, int, int, Dict[int, int]]:
+        """Work out once per position what limits the moves of the side to move.
+
+        Returns
+        -------
+        Tuple[int, int, int, Dict[int, int]]
+            The king square, the bitboard of the pieces giving check, the squares a
+            move other than the king's has to end on (all of them when not in check,
+            none in double check) and the line every pinned piece is bound to by its square.
+        """
+        board = self.board
+        color = board.color_to_move
+        ecolor = Piece.get_enemy_color(color)
+        bitboards = board.bitboards
+        ksq = Bitboards.lsb(bitboards[color | Piece.KING])
+
+        checkers = self._attackers_to(ksq, ecolor, board.occupied)
+        if not checkers:
+            check_mask = FULL_BB
+        elif checkers & (checkers - 1):
+            check_mask = 0
+        else:
+            # Capture the checker or step in between.
+            check_mask = checkers | BETWEEN[ksq][Bitboards.lsb(checkers)]
+
+        pins = {}
+        # Enemy sliders that would see the king if only our pieces were not there.
+        enemy_occupancy = board.occupancy[ecolor]
+        queens = bitboards[ecolor | Piece.QUEEN]
+        snipers = (
+            rook_attacks(ksq, enemy_occupancy) & (bitboards[ecolor | Piece.ROOK] | queens)
+            | bishop_attacks(ksq, enemy_occupancy) & (bitboards[ecolor | Piece.BISHOP] | queens)
+        )
+        own = board.occupancy[color]
+        for sniper_sq in Bitboards.iter_squares(snipers):
+            blockers = BETWEEN[ksq][sniper_sq] & board.occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pins[Bitboards.lsb(blockers)] = LINE[ksq][sniper_sq]
+        return ksq, checkers, check_mask, pins
+
+    def _pawn_targets(self, color: int, check_mask: int, pins: Dict[int, int]) -> List[Tuple[int, int]]:
+        """The legal target squares of every pawn that can move, as (square, targets bitboard) pairs."""
+        board = self.board
+        occupied = board.occupied
+        enemy_occupancy = board.occupancy[Piece.get_enemy_color(color)]
+        forward, start_row = (-8, 6) if color == Piece.WHITE else (8, 1)
+        pawn_attacks = PAWN_ATTACKS[color]
+        ep_bb = 0
+        if board.en_passant is not None:
+            ep_bb = SQUARE_BB[board.en_passant[0] * 8 + board.en_passant[1]]
+
+        pawn_targets = []
+        for sq in Bitboards.iter_squares(board.bitboards[color | Piece.PAWN]):
+            targets = pawn_attacks[sq] & enemy_occupancy
+            push = sq + forward
+            if not occupied & SQUARE_BB[push]:
+                targets |= SQUARE_BB[push]
+                if sq >> 3 == start_row and not occupied & SQUARE_BB[push + forward]:
+                    targets |= SQUARE_BB[push + forward]
+            targets &= check_mask
+            if sq in pins:
+                targets &= pins[sq]
+            if pawn_attacks[sq] & ep_bb and self._is_en_passant_legal(sq, Bitboards.lsb(ep_bb), forward):
+                targets |= ep_bb
+            if targets:
+                pawn_targets.append((sq, targets))
+        return pawn_targets
+
+    def _is_en_passant_legal(self, start_sq: int, ep_sq: int, forward: int) -> bool:
+        """Play the capture on the occupancy and look for attackers of the king.
+
+        Two pawns leave the rank at once, so the usual pin test misses the rank pin and
+        the checks a captured pawn gives or uncovers, testing the resulting board covers all of them.
+        """
+        board = self.board
+        color = board.color_to_move
+        captured_bb = SQUARE_BB[ep_sq - forward]
+        occupied = board.occupied ^ SQUARE_BB[start_sq] ^ captured_bb | SQUARE_BB[ep_sq]
+        ksq = Bitboards.lsb(board.bitboards[color | Piece.KING])
+        return not self._attackers_to(ksq, Piece.get_enemy_color(color), occupied) & ~captured_bb
+
+    def _castling_targets(self, ksq: int, color: int) -> int:
+        """Bitboard of the squares the king can castle to, the caller makes sure it is not in check."""
+        board = self.board
+        if ksq != CASTLINGS[color][0][2] - 1:
+            # Rights set by hand on a king that is not on its starting square.
+            return 0
+        ecolor = Piece.get_enemy_color(color)
+        rooks = board.bitboards[color | Piece.ROOK]
+        targets = 0
+        for castle_bit, end_sq, passing_sq, empty_bb, rook_sq in CASTLINGS[color]:
+            if (
+                board.castling & castle_bit
+                and rooks & SQUARE_BB[rook_sq]
+                and not board.occupied & empty_bb
+                and not self.is_attacked(passing_sq, ecolor)
+                and not self.is_attacked(end_sq, ecolor)
+            ):
+                targets |= SQUARE_BB[end_sq]
+        return targets
+
+    def get_castling_coords(self, piece: np.uint32) -> Set[Tuple[int, int]]:
+        """Get the castling destinations of a king.
+
+        The king may not castle out of check, through or into an attacked square.
+        """
+        pcolor = Piece.get_color(piece)
+        ksq = Bitboards.lsb(self.board.bitboards[pcolor | Piece.KING])
+        if self.board.squares[ksq] != piece or self.is_king_in_check(pcolor):
+            return set()
+        return Bitboards.to_coords_set(self._castling_targets(ksq, pcolor))
+
+    def is_attacked(self, square: int, by_color: int, occupied: Optional[int] = None) -> bool:
+        """Check if a square is attacked by the pieces of a colour.
+
+        It looks outward from the square instead of generating the enemy moves: a
+        piece standing on the square attacks exactly the squares the same kind of
+        enemy piece would attack it from, so the knight and king tables, the pawn
+        diagonals and the first blocker on each ray are enough.
+
+        Parameters
+        ----------
+        square : int
+            The square index (0-63).
+        by_color : int
+            Colour of the attacking pieces.
+        occupied : int, optional
+            Occupancy that blocks the sliders, the board's own by default.
+
+        Returns
+        -------
+        bool
+            Whether any piece of by_color attacks the square.
+        """
+        bitboards = self.board.bitboards
+        if KNIGHT_ATTACKS[square] & bitboards[by_color | Piece.KNIGHT]:
+            return True
+        if PAWN_ATTACKS[Piece.get_enemy_color(by_color)][square] & bitboards[by_color | Piece.PAWN]:
+            return True
+        if KING_ATTACKS[square] & bitboards[by_color | Piece.KING]:
+            return True
+        if occupied is None:
+            occupied = self.board.occupied
+        queens = bitboards[by_color | Piece.QUEEN]
+        if rook_attacks(square, occupied) & (bitboards[by_color | Piece.ROOK] | queens):
+            return True
+        return bool(bishop_attacks(square, occupied) & (bitboards[by_color | Piece.BISHOP] | queens))
 
-    def is_king_in_check(self, enemies, king_coords) -> bool:
-        """Check if the king is in check."""
-        for _, enemy_list in enemies.items():
-            for e, ecrd in enemy_list.items():
-                if king_coords in self.get_possible_coords((e, ecrd)):
-                    return True
-        return False
+    def is_king_in_check(self, color: Optional[int] = None) -> bool:
+        """Check if the king of a colour, the side to move by default, is in check."""
+        if color is None:
+            color = self.board.color_to_move
+        ksq = Bitboards.lsb(self.board.bitboards[color | Piece.KING])
+        return self.is_attacked(ksq, Piece.get_enemy_color(color))
 
     def are_coords_under_attack(self, coords_list: List[Tuple[int, int]], color: Literal[256, 512]) -> bool:
         """Check if any of the given coords are being attacked.
@@ -28,29 +336,16 @@ class MoveGenerator:
         ----------
         coords_list : List[Tuple[int, int]]
             A list of coords to check if they are being attacked.
-        enemy_color : int
-            The color of the enemy pieces.
-        enemies_pieces : List[Piece]
-            The enemy pieces.
+        color : int
+            The color of the side being attacked.
 
         Returns
         -------
         bool
             Returns true if any of the coords are being attacked.
         """
-        # Check if the king is in check from the rest of the pieces
-        enemy_moves = self.get_enemy_possible_coords(color)
-        return any(tuple(coords) in enemy_moves for coords in coords_list)
-
-    def get_enemy_possible_coords(self, color: Literal[256, 512]):
-        """Get all the enemy moves."""
-        enemy_possible_coords = set()
-        for _, enemy_list in self.board.get_enemies(color).items():
-            for e, ecrd in enemy_list.items():
-                enemy_possible_coords = (
-                    enemy_possible_coords | self.get_possible_coords((e, ecrd))
-                )
-        return enemy_possible_coords
+        ecolor = Piece.get_enemy_color(color)
+        return any(self.is_attacked(coords[0] * 8 + coords[1], ecolor) for coords in coords_list)
 
     def get_possible_coords(self, piece_info: Tuple[np.uint32, Tuple[int, int]]) -> Set[Tuple[int, int]]:
         """Return all the possible coords for a piece.
@@ -72,6 +367,6 @@ class MoveGenerator:
             Piece.QUEEN: PiecesMoves.queen_moves,
         }[ptype]
         if ptype == Piece.PAWN:
-            return piece_func(self.board.state, piece_info, self.board.en_passant)
+            return piece_func(self.board, piece_info, self.board.en_passant)
         else:
-            return piece_func(self.board.state, piece_info)
\ No newline at end of file
+            return piece_func(self.board, piece_info)
\ No newline at end of file
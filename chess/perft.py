@@ -0,0 +1,338 @@
+"""Perft: count the leaf nodes of the legal move tree to a given depth.
+
+It is the standard correctness and throughput benchmark for the move
+generator.  Run ``python -m chess.perft`` to go through PERFT_TESTS.txt, or
+``python -m chess.perft --fen "<fen>" --depth 3 --divide`` to see the count
+below every root move of a single position.  ``--workers N`` spreads the
+subtrees over N processes and ``--hash MB`` caches subtree counts so
+transpositions are only counted once.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from chess.board import Board
+from chess.moves.move import Move
+from chess.moves.movegenerator import MoveGenerator
+
+PERFT_TESTS_PATH = Path(__file__).resolve().parent.parent / "PERFT_TESTS.txt"
+PERFT_LINE = re.compile(r"^(?P<fen>[^;]+);\s*perft\s+(?P<depth>\d+)\s*=\s*(?P<nodes>\d+)")
+
+SQUARE_MASK = Move.SQUARE_MASK
+END_SHIFT = Move.END_SHIFT
+FLAG_SHIFT = Move.FLAG_SHIFT
+PROMOTION_TYPES = Move.PROMOTION_TYPES
+
+# A cache entry is the position key plus one word holding the node count and the depth.
+CACHE_ENTRY_BYTES = 16
+CACHE_DEPTH_BITS = 8
+CACHE_DEPTH_MASK = 0xFF
+# Spreads the same position at different depths over different slots.
+CACHE_DEPTH_SALT = 0x9E3779B97F4A7C15
+
+
+class PerftCase(NamedTuple):
+    """A position of the perft suite with its expected node count."""
+
+    name: str
+    fen: str
+    depth: int
+    nodes: int
+
+
+def parse_perft_file(path: Path = PERFT_TESTS_PATH) -> List[PerftCase]:
+    """Parse a perft suite, a '//--' comment line names the position that follows it."""
+    cases = []
+    name = ""
+    for line in Path(path).read_text().splitlines():
+        line = line.strip()
+        if line.startswith("//"):
+            name = line.lstrip("/-").strip()
+        elif match := PERFT_LINE.match(line):
+            cases.append(PerftCase(name, match["fen"].strip(), int(match["depth"]), int(match["nodes"])))
+    return cases
+
+
+class PerftCache:
+    """Bounded cache of subtree node counts keyed by (position key, remaining depth).
+
+    The entries live in two preallocated ``array('Q')`` buffers like the
+    TranspositionTable, a new entry always replaces the one in its slot.
+    """
+
+    def __init__(self, size_mb: float = 16):
+        entries = max(1, int(size_mb * 1024 * 1024) // CACHE_ENTRY_BYTES)
+        # Round down to a power of two so the index is a simple mask.
+        self.entries: int = 1 << (entries.bit_length() - 1)
+        self.mask: int = self.entries - 1
+        self.keys: array = array("Q", bytes(8 * self.entries))
+        self.data: array = array("Q", bytes(8 * self.entries))
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stores: int = 0
+
+    def probe(self, key: int, depth: int) -> Optional[int]:
+        """Node count of the position at that depth or None on a miss."""
+        slot = (key ^ depth * CACHE_DEPTH_SALT) & self.mask
+        data = self.data[slot]
+        if self.keys[slot] == key and data & CACHE_DEPTH_MASK == depth:
+            self.hits += 1
+            return data >> CACHE_DEPTH_BITS
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, nodes: int) -> None:
+        """Remember the node count of a subtree."""
+        slot = (key ^ depth * CACHE_DEPTH_SALT) & self.mask
+        self.stores += 1
+        self.keys[slot] = key
+        self.data[slot] = nodes << CACHE_DEPTH_BITS | depth
+
+    def stats(self) -> Dict[str, float]:
+        """Counters collected since the cache was created."""
+        probes = self.hits + self.misses
+        return {
+            "size_mb": self.entries * CACHE_ENTRY_BYTES / (1024 * 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "stores": self.stores,
+        }
+
+
+def perft(board: Board, depth: int, cache: Optional[PerftCache] = None) -> int:
+    """Count the leaf nodes depth plies below the board position, optionally through a subtree cache."""
+    if depth == 0:
+        return 1
+    return _perft(board, MoveGenerator(board), depth, cache)
+
+
+def _perft(board: Board, movegen: MoveGenerator, depth: int, cache: Optional[PerftCache] = None) -> int:
+    if cache is not None:
+        nodes = cache.probe(board.key, depth)
+        if nodes is not None:
+            return nodes
+    if depth == 1:
+        # Only the number of moves is needed, they do not have to be played.
+        nodes = movegen.count_legal_moves()
+        if cache is not None:
+            # Even the leaf counts are worth keeping, a probe is still cheaper than counting the moves.
+            cache.store(board.key, 1, nodes)
+        return nodes
+    nodes = 0
+    for move in movegen.get_all_moves():
+        board.make_move(move & SQUARE_MASK, (move >> END_SHIFT) & SQUARE_MASK, PROMOTION_TYPES[move >> FLAG_SHIFT])
+        nodes += _perft(board, movegen, depth - 1, cache)
+        board.unmake_move()
+    if cache is not None:
+        cache.store(board.key, depth, nodes)
+    return nodes
+
+
+def divide(board: Board, depth: int, cache: Optional[PerftCache] = None) -> Dict[str, int]:
+    """Perft split by root move, the usual way to find which move a bug hides behind."""
+    movegen = MoveGenerator(board)
+    counts = {}
+    for move in movegen.get_all_moves():
+        board.make_move(*Move.decode(move))
+        counts[Move.to_str(move)] = _perft(board, movegen, depth - 1, cache) if depth > 1 else 1
+        board.unmake_move()
+    return counts
+
+
+def split_moves(board: Board, split_depth: int) -> List[Tuple[int, ...]]:
+    """List every legal move sequence split_depth plies long, those are the subtrees handed to the workers.
+
+    Sequences that end early in mate or stalemate have no leaves below the split depth and are left out.
+    """
+    if split_depth == 0:
+        return [()]
+    movegen = MoveGenerator(board)
+    sequences = []
+    for move in movegen.get_all_moves():
+        board.make_move(*Move.decode(move))
+        sequences.extend((move,) + rest for rest in split_moves(board, split_depth - 1))
+        board.unmake_move()
+    return sequences
+
+
+# The cache of a worker process, it lives as long as the process so every task of the run shares it.
+_worker_cache: Optional[PerftCache] = None
+
+
+def _init_worker(hash_mb: float) -> None:
+    global _worker_cache
+    _worker_cache = PerftCache(hash_mb) if hash_mb else None
+
+
+def _perft_task(fen: str, moves: Tuple[int, ...], depth: int) -> Tuple[Tuple[int, ...], int, int, float, int, int]:
+    """Worker side of the parallel perft, every worker rebuilds its own board from the fen.
+
+    Besides the count it returns the pid, the time taken and the cache hits and misses of the worker so far.
+    """
+    start = time.perf_counter()
+    board = Board(fen)
+    for move in moves:
+        board.make_move(*Move.decode(move))
+    nodes = perft(board, depth, _worker_cache)
+    hits, misses = (_worker_cache.hits, _worker_cache.misses) if _worker_cache is not None else (0, 0)
+    return moves, nodes, os.getpid(), time.perf_counter() - start, hits, misses
+
+
+def parallel_perft(
+    fen: str,
+    depth: int,
+    workers: Optional[int] = None,
+    split_depth: int = 1,
+    verbose: bool = True,
+    hash_mb: float = 0,
+) -> Dict[str, int]:
+    """Perft with the subtrees below split_depth spread over a pool of processes.
+
+    Parameters
+    ----------
+    fen : str
+        The root position.
+    depth : int
+        Total depth of the perft.
+    workers : int, optional
+        Number of processes, defaults to the number of CPUs.
+    split_depth : int
+        Plies played by the main process before handing out subtrees, more gives smaller and better balanced tasks.
+    verbose : bool
+        Print how much work and time every worker got.
+    hash_mb : float
+        Size of the subtree cache of every worker, 0 for none.
+
+    Returns
+    -------
+    Dict[str, int]
+        Nodes below every root move, like divide.
+    """
+    split_depth = max(1, min(split_depth, depth))
+    sequences = split_moves(Board(fen), split_depth)
+    counts: Dict[str, int] = {}
+    # pid -> [tasks, nodes, busy seconds, cache hits, cache misses]
+    worker_stats: Dict[int, List[float]] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(hash_mb,)) as pool:
+        futures = [pool.submit(_perft_task, fen, moves, depth - split_depth) for moves in sequences]
+        for future in as_completed(futures):
+            moves, nodes, pid, elapsed, hits, misses = future.result()
+            root_move = Move.to_str(moves[0])
+            counts[root_move] = counts.get(root_move, 0) + nodes
+            stats = worker_stats.setdefault(pid, [0, 0, 0.0, 0, 0])
+            stats[0] += 1
+            stats[1] += nodes
+            stats[2] += elapsed
+            # The cache counters are running totals of the worker.
+            stats[3] = max(stats[3], hits)
+            stats[4] = max(stats[4], misses)
+
+    if verbose:
+        for pid, (tasks, nodes, busy, hits, misses) in sorted(worker_stats.items()):
+            cache_str = f"  cache {hits} hits {misses} misses" if hash_mb else ""
+            print(f"  worker {pid}: {tasks:5} tasks {nodes:>12} nodes {busy:8.2f}s busy{cache_str}")
+    return counts
+
+
+def print_divide(counts: Dict[str, int]) -> None:
+    """Print a divide result sorted by move."""
+    for move_str, nodes in sorted(counts.items()):
+        print(f"{move_str}: {nodes}")
+    print(f"\nMoves: {len(counts)}  Nodes: {sum(counts.values())}")
+
+
+def run_case(
+    fen: str,
+    depth: int,
+    expected: Optional[int] = None,
+    name: str = "",
+    show_divide: bool = False,
+    workers: int = 0,
+    split_depth: int = 1,
+    hash_mb: float = 0,
+) -> bool:
+    """Run perft on one position and print a report line, returns whether the count matched.
+
+    With workers the perft runs in that many processes, see parallel_perft, with hash_mb it uses a PerftCache.
+    """
+    board = Board(fen)
+    cache = PerftCache(hash_mb) if hash_mb and not workers else None
+    start = time.perf_counter()
+    if workers and depth > 1:
+        counts = parallel_perft(fen, depth, workers, split_depth, hash_mb=hash_mb)
+        nodes = sum(counts.values())
+    elif show_divide:
+        counts = divide(board, depth, cache)
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(board, depth, cache)
+    elapsed = time.perf_counter() - start
+
+    if show_divide:
+        print(f"\n{name or fen}")
+        print_divide(counts)
+    passed = expected is None or nodes == expected
+    status = "-" if expected is None else ("PASS" if passed else "FAIL")
+    expected_str = "" if expected is None else f" expected {expected:>10}"
+    nps = nodes / elapsed if elapsed > 0 else 0.0
+    print(f"{status:4} depth {depth} nodes {nodes:>10}{expected_str}  {elapsed:8.2f}s  {nps:10.0f} nps  {name or fen}")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"     cache {stats['hits']} hits {stats['misses']} misses ({stats['hit_rate']:.1%}) {stats['stores']} stores")
+    return passed
+
+
+def run_suite(
+    path: Path = PERFT_TESTS_PATH,
+    max_depth: Optional[int] = None,
+    show_divide: bool = False,
+    workers: int = 0,
+    split_depth: int = 1,
+    hash_mb: float = 0,
+) -> bool:
+    """Run every position of a perft suite.
+
+    With max_depth the deeper cases are run at that depth instead, without an expected count to compare to.
+    """
+    all_passed = True
+    start = time.perf_counter()
+    for case in parse_perft_file(path):
+        if max_depth is not None and case.depth > max_depth:
+            passed = run_case(case.fen, max_depth, None, case.name, show_divide, workers, split_depth, hash_mb)
+        else:
+            passed = run_case(case.fen, case.depth, case.nodes, case.name, show_divide, workers, split_depth, hash_mb)
+        all_passed &= passed
+    print(f"\n{'All passed' if all_passed else 'Some FAILED'} in {time.perf_counter() - start:.2f}s")
+    return all_passed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Perft the move generator.")
+    parser.add_argument("--file", type=Path, default=PERFT_TESTS_PATH, help="perft suite to run")
+    parser.add_argument("--fen", help="run a single position instead of the suite")
+    parser.add_argument("--depth", type=int, default=3, help="depth for --fen")
+    parser.add_argument("--max-depth", type=int, help="cap the depth of the suite positions")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    parser.add_argument("--workers", type=int, default=0, help="number of processes, 0 runs in this process")
+    parser.add_argument("--split-depth", type=int, default=1, help="plies played before the subtrees go to the workers")
+    parser.add_argument("--hash", type=float, default=0, help="MB for the subtree count cache (per worker), 0 disables it")
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        passed = run_case(args.fen, args.depth, None, "", args.divide, args.workers, args.split_depth, args.hash)
+    else:
+        passed = run_suite(args.file, args.max_depth, args.divide, args.workers, args.split_depth, args.hash)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())